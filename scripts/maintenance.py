@@ -15,7 +15,6 @@ Use the project virtual environment for all actions when possible.
 from __future__ import annotations
 
 import argparse
-import os
 import subprocess
 from pathlib import Path
 import json
@@ -28,23 +27,14 @@ from packaging.version import InvalidVersion, Version
 from packaging.markers import default_environment
 
 from gmail_automation.logging_utils import get_logger, setup_logging
+from scripts.setup import run
+from scripts.setup import venv_python as _venv_python
 
 LOGGER = get_logger(__name__)
 
 
-def run(cmd: list[str], dry_run: bool) -> None:
-    if dry_run:
-        LOGGER.debug("dry-run: %s", " ".join(cmd))
-        return
-    subprocess.run(cmd, check=True)
-
-
 def venv_python(venv: Path) -> str:
-    python = (
-        venv
-        / ("Scripts" if os.name == "nt" else "bin")
-        / ("python.exe" if os.name == "nt" else "python")
-    )
+    python = _venv_python(venv)
     return str(python if python.exists() else Path("python"))
 
 
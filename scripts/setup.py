@@ -2,10 +2,12 @@
 """Create a virtual environment and install runtime and development dependencies.
 
 Enhancements:
-- Upgrades ``pip`` inside the venv before installing dependencies.
+- Upgrades ``pip`` in the same pip invocation that installs dependencies.
 - Installs from ``requirements-dev.txt`` (kept for tests and tooling).
 - Optional pre-commit hook installation.
 - Optional source compilation check for fast feedback.
+- Downloads requirement wheels in the background while a new venv is created.
+- Optional hashed ``requirements-dev.lock`` that skips dependency resolution.
 """
 
 from __future__ import annotations
@@ -22,18 +24,36 @@ from gmail_automation.logging_utils import get_logger, setup_logging
 
 LOGGER = get_logger(__name__)
 
+WHEEL_CACHE = Path.home() / ".cache" / "gmail_automation" / "wheels"
+
+REQUIREMENTS_FILES = (Path("requirements.txt"), Path("requirements-dev.txt"))
+LOCK_FILE = Path("requirements-dev.lock")
+# Minimum pip installed alongside the requirements. A version floor, not
+# ``--upgrade``, so already-satisfied dev dependencies are left alone.
+PIP_REQUIREMENT = "pip>=23.1"
+
+_VENV_BIN = "Scripts" if os.name == "nt" else "bin"
+_VENV_PYTHON = "python.exe" if os.name == "nt" else "python"
+
 
 def run(cmd: list[str], dry_run: bool) -> None:
     if dry_run:
         LOGGER.debug("dry-run: %s", " ".join(cmd))
         return
-    subprocess.run(cmd, check=True)
+    # ``close_fds=False`` lets CPython launch via ``posix_spawn`` instead of
+    # fork+exec on POSIX. Descriptors are non-inheritable by default, so no
+    # extra handles leak into the child.
+    subprocess.run(cmd, check=True, close_fds=False)
 
 
 def _is_valid_venv(venv: Path) -> bool:
-    cfg = venv / "pyvenv.cfg"
-    py = venv_python(venv)
-    return cfg.exists() and py.exists()
+    # The interpreter only exists once ``venv`` has written pyvenv.cfg, so one
+    # stat of the interpreter is enough to tell a usable venv apart.
+    try:
+        os.stat(venv_python(venv))
+    except OSError:
+        return False
+    return True
 
 
 def _safe_rmtree(path: Path) -> None:
@@ -74,29 +94,141 @@ def create_venv(venv: Path, dry_run: bool) -> None:
             raise
 
 
+def start_wheel_prefetch(dry_run: bool) -> subprocess.Popen | None:
+    """Start downloading requirement wheels into ``WHEEL_CACHE``.
+
+    The download runs in the background so it overlaps with venv creation.
+    Returns the running process, or ``None`` when prefetching is skipped.
+    """
+    if dry_run:
+        LOGGER.debug("dry-run: skipping wheel prefetch")
+        return None
+    WHEEL_CACHE.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        sys.executable,
+        "-m",
+        "pip",
+        "download",
+        "--quiet",
+        "-r",
+        "requirements-dev.txt",
+        "-d",
+        str(WHEEL_CACHE),
+    ]
+    try:
+        return subprocess.Popen(
+            cmd,
+            close_fds=False,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError as exc:
+        LOGGER.debug("wheel prefetch unavailable: %s", exc)
+        return None
+
+
+def finish_wheel_prefetch(proc: subprocess.Popen | None) -> Path | None:
+    """Wait for a prefetch started by :func:`start_wheel_prefetch`.
+
+    Returns the wheel cache directory on success so it can be passed to pip
+    as ``--find-links``; failures fall back to the package index.
+    """
+    if proc is None:
+        return None
+    if proc.wait() != 0:
+        LOGGER.warning("wheel prefetch failed; installing from the package index")
+        return None
+    return WHEEL_CACHE
+
+
 def venv_python(venv: Path) -> Path:
-    return (
-        venv
-        / ("Scripts" if os.name == "nt" else "bin")
-        / ("python.exe" if os.name == "nt" else "python")
-    )
+    return venv / _VENV_BIN / _VENV_PYTHON
+
 
+def _lock_is_current() -> bool:
+    """Return ``True`` when ``LOCK_FILE`` is newer than every requirements file."""
 
-def upgrade_pip(venv: Path, dry_run: bool) -> None:
-    LOGGER.info("upgrading pip inside the virtual environment")
-    run([str(venv_python(venv)), "-m", "pip", "install", "--upgrade", "pip"], dry_run)
+    try:
+        lock_mtime = LOCK_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return all(
+        not req.exists() or req.stat().st_mtime_ns <= lock_mtime
+        for req in REQUIREMENTS_FILES
+    )
 
 
-def install_requirements(venv: Path, dry_run: bool) -> None:
-    if dry_run:
-        LOGGER.info("skipping dependency installation")
+def generate_lock(venv: Path, dry_run: bool) -> None:
+    """Compile ``requirements-dev.txt`` into a hashed ``LOCK_FILE``.
+
+    Uses pip-tools inside the venv and is skipped while the lock is current.
+    """
+    if _lock_is_current():
+        LOGGER.info("%s is up to date", LOCK_FILE)
         return
+    LOGGER.info("generating %s", LOCK_FILE)
+    python = str(venv_python(venv))
+    run([python, "-m", "pip", "install", "--quiet", "pip-tools"], dry_run)
     run(
-        [str(venv_python(venv)), "-m", "pip", "install", "-r", "requirements-dev.txt"],
+        [
+            python,
+            "-m",
+            "piptools",
+            "compile",
+            "--quiet",
+            "--generate-hashes",
+            "--output-file",
+            str(LOCK_FILE),
+            "requirements-dev.txt",
+        ],
         dry_run,
     )
 
 
+def install_requirements(
+    venv: Path, dry_run: bool, find_links: Path | None = None
+) -> None:
+    """Upgrade pip and install development requirements.
+
+    Both steps share one pip process so the interpreter start-up and pip's
+    import cost are paid once instead of twice. ``find_links`` points pip at
+    locally prefetched wheels. When a current ``LOCK_FILE`` exists it is
+    installed with ``--no-deps`` so pip skips dependency resolution.
+    """
+    if dry_run:
+        LOGGER.info("skipping dependency installation")
+        return
+    python = str(venv_python(venv))
+    if _lock_is_current():
+        LOGGER.info("installing pinned dependencies from %s", LOCK_FILE)
+        # Hash-checking mode rejects the unpinned pip requirement, so the lock
+        # file alone defines what gets installed.
+        cmd = [
+            python,
+            "-m",
+            "pip",
+            "install",
+            "--require-hashes",
+            "--no-deps",
+            "-r",
+            str(LOCK_FILE),
+        ]
+    else:
+        LOGGER.info("installing %s and requirements-dev.txt", PIP_REQUIREMENT)
+        cmd = [
+            python,
+            "-m",
+            "pip",
+            "install",
+            PIP_REQUIREMENT,
+            "-r",
+            "requirements-dev.txt",
+        ]
+    if find_links is not None:
+        cmd.extend(["--find-links", str(find_links)])
+    run(cmd, dry_run)
+
+
 def install_precommit_hooks(venv: Path, dry_run: bool) -> None:
     LOGGER.info("installing pre-commit hooks")
     run([str(venv_python(venv)), "-m", "pre_commit", "install"], dry_run)
@@ -133,15 +265,31 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="skip compilation validation",
     )
+    parser.add_argument(
+        "--lock",
+        action="store_true",
+        help="generate requirements-dev.lock with pip-tools and install from it",
+    )
     parser.add_argument("--log-level", default="INFO")
     args = parser.parse_args(argv)
 
     setup_logging(level=args.log_level)
     venv = Path(args.venv)
-    create_venv(venv, args.dry_run)
+    prefetch = None
+    if not args.check and not _is_valid_venv(venv):
+        prefetch = start_wheel_prefetch(args.dry_run)
+    try:
+        create_venv(venv, args.dry_run)
+        find_links = finish_wheel_prefetch(prefetch)
+    finally:
+        # Don't orphan the background download if venv creation fails.
+        if prefetch is not None and prefetch.poll() is None:
+            prefetch.terminate()
+            prefetch.wait()
     if not args.check:
-        upgrade_pip(venv, args.dry_run)
-        install_requirements(venv, args.dry_run)
+        if args.lock:
+            generate_lock(venv, args.dry_run)
+        install_requirements(venv, args.dry_run, find_links)
         if args.install_hooks:
             install_precommit_hooks(venv, args.dry_run)
         if not args.no_compile:
@@ -5,6 +5,8 @@ from __future__ import annotations
 
 import argparse
 import fnmatch
+import os
+import re
 import subprocess
 
 from gmail_automation.logging_utils import get_logger, setup_logging
@@ -15,21 +17,47 @@ PATTERNS = [
     "gmail_config-final.json",
     "last_run.txt",
     "processed_email_ids.txt",
+    "*message_details_cache.json",
     "*.log",
 ]
 
+# All patterns folded into one regex so each path is tested in a single match.
+_COMBINED = re.compile("|".join(fnmatch.translate(pat) for pat in PATTERNS))
+
 LOGGER = get_logger(__name__)
 
 
-def run_git(args: list[str]) -> list[str]:
-    result = subprocess.run(["git", *args], check=False, text=True, capture_output=True)
+def list_changed_files() -> tuple[list[str], list[str]]:
+    """Return ``(staged, untracked)`` paths from a single ``git status`` call."""
+
+    result = subprocess.run(
+        ["git", "status", "--porcelain", "-z", "--untracked-files=all"],
+        check=False,
+        text=True,
+        capture_output=True,
+    )
     if result.returncode != 0:
-        return []
-    return [line for line in result.stdout.splitlines() if line]
+        return [], []
+    staged: list[str] = []
+    untracked: list[str] = []
+    entries = iter(result.stdout.split("\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        status, path = entry[:2], entry[3:]
+        if status == "??":
+            untracked.append(path)
+            continue
+        if status[0] in "RC":
+            # Renames and copies are followed by the original path.
+            next(entries, None)
+        if status[0] not in " !":
+            staged.append(path)
+    return staged, untracked
 
 
 def matches(path: str) -> bool:
-    return any(fnmatch.fnmatch(path, pat) for pat in PATTERNS)
+    return _COMBINED.match(os.path.normcase(path)) is not None
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -41,13 +69,12 @@ def main(argv: list[str] | None = None) -> int:
     setup_logging(level=args.log_level)
     problems = False
 
-    staged = run_git(["diff", "--cached", "--name-only"])
+    staged, untracked = list_changed_files()
     for file in staged:
         if matches(file):
             LOGGER.error("staged sensitive file: %s", file)
             problems = True
 
-    untracked = run_git(["ls-files", "--others", "--exclude-standard"])
     for file in untracked:
         if matches(file):
             LOGGER.error("untracked sensitive file: %s", file)
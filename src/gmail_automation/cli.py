@@ -1,10 +1,18 @@
 from __future__ import annotations
 
 import argparse
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone, tzinfo
+from email.utils import parseaddr, parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Set, Tuple
 
 from dateutil import parser
 from zoneinfo import ZoneInfo
@@ -19,36 +27,69 @@ from .config import (
     get_sender_last_run_times,
     update_sender_last_run_times,
     update_last_run_time,
-    get_data_dir,
+    ensure_data_dir,
     DEFAULT_LAST_RUN_TIME,
+    DISPLAY_DATE_FORMAT,
+    PACIFIC,
 )
 from .gmail_service import (
     get_credentials,
     build_service,
     get_existing_labels_cached,
+    batch_delete_messages,
     batch_fetch_messages,
+    batch_modify_messages,
+    execute_request_with_backoff,
+    execute_batched,
     fetch_emails_to_label_optimized,
+    fetch_message_lists,
+    LIST_FETCH_WORKERS,
+    METADATA_HEADERS,
+    reset_processed_queries,
     modify_message,
 )
 from .logging_utils import get_logger, setup_logging
 from .ignored_rules import IgnoredRulesEngine, IgnoredRule
 
-message_details_cache: Dict[
-    str, Tuple[Optional[str], Optional[str], Optional[str], Optional[bool]]
-] = {}
-processed_queries: Set[str] = set()
+# Bounded LRU caches keyed on ``(user_id, msg_id)``. Failed lookups live in a
+# separate, smaller cache so sentinels never evict real details.
+MESSAGE_DETAILS_CACHE_SIZE = 16384
+FAILED_DETAILS_CACHE_SIZE = 1024
+message_details_cache: OrderedDict[Tuple[str, str], Tuple[str, str, str, bool]] = (
+    OrderedDict()
+)
+failed_message_details: OrderedDict[Tuple[str, str], None] = OrderedDict()
+# Sender queries may be processed on worker threads; guards both caches above.
+_details_cache_lock = threading.Lock()
+# Worker threads processing sender queries, capped like message listing to
+# stay within Gmail's concurrent request quota.
+LABELING_WORKERS = LIST_FETCH_WORKERS
+# Longest ``q`` built when OR-ing senders together, well under the practical
+# URL limit for a ``messages.list`` GET.
+MAX_SENDER_QUERY_LENGTH = 1500
+
+_MOUNTAIN = ZoneInfo("America/Denver")
+_CENTRAL = ZoneInfo("America/Chicago")
+_EASTERN = ZoneInfo("America/New_York")
+
+# Read-only so the shared mapping handed to dateutil cannot be mutated.
+TZINFOS: Mapping[str, tzinfo] = MappingProxyType(
+    {
+        "UTC": timezone.utc,
+        "PST": PACIFIC,
+        "PDT": PACIFIC,
+        "MST": _MOUNTAIN,
+        "MDT": _MOUNTAIN,
+        "CST": _CENTRAL,
+        "CDT": _CENTRAL,
+        "EST": _EASTERN,
+        "EDT": _EASTERN,
+    }
+)
 
-TZINFOS: dict[str, ZoneInfo] = {
-    "UTC": ZoneInfo("UTC"),
-    "PST": ZoneInfo("America/Los_Angeles"),
-    "PDT": ZoneInfo("America/Los_Angeles"),
-    "MST": ZoneInfo("America/Denver"),
-    "MDT": ZoneInfo("America/Denver"),
-    "CST": ZoneInfo("America/Chicago"),
-    "CDT": ZoneInfo("America/Chicago"),
-    "EST": ZoneInfo("America/New_York"),
-    "EDT": ZoneInfo("America/New_York"),
-}
+# Numeric UTC offsets (``+0000``/``-0700``) are unambiguous, so headers carrying
+# one can skip dateutil. Named zones go through ``TZINFOS`` as before.
+_NUMERIC_OFFSET_RE = re.compile(r"[+-]\d{4}\b")
 
 
 logger = get_logger(__name__)
@@ -68,56 +109,64 @@ class SelectedEmailDeletion:
 
 
 def parse_args(argv=None):
-    parser = argparse.ArgumentParser(description="Gmail automation script")
-    parser.add_argument(
+    ap = argparse.ArgumentParser(description="Gmail automation script")
+    ap.add_argument(
         "--config",
         "-c",
+        type=Path,
         help="Path to configuration file",
         default=None,
     )
-    parser.add_argument(
+    ap.add_argument(
         "--dry-run",
         action="store_true",
         help="Run without modifying messages",
     )
-    parser.add_argument(
+    ap.add_argument(
         "-v",
         "--verbose",
         action="store_true",
         help="Enable verbose logging (equivalent to --log-level DEBUG)",
     )
-    parser.add_argument(
+    ap.add_argument(
         "--log-level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
         default="INFO",
         help="Set the logging level (default: INFO)",
     )
-    parser.add_argument(
+    ap.add_argument(
         "--log-file",
+        type=Path,
         default=None,
         help="Optional path to a log file",
     )
-    parser.add_argument(
+    ap.add_argument(
         "--delete-selected",
         action="store_true",
         help="Delete messages listed in SELECTED_EMAIL_DELETIONS.",
     )
-    parser.add_argument(
+    ap.add_argument(
         "--confirm",
         action="store_true",
         help="Required to perform destructive actions such as --delete-selected.",
     )
-    parser.add_argument(
+    ap.add_argument(
         "--version",
         action="version",
         version=f"gmail_automation {__version__}",
     )
-    return parser.parse_args(argv)
+    return ap.parse_args(argv)
 
 
+@lru_cache(maxsize=1 << 15)
 def parse_email_date(date_str: str) -> Optional[datetime]:
     """Parse an email date string and return it in Pacific time.
 
+    RFC 2822 ``Date`` headers with a numeric offset and dates in
+    :data:`DISPLAY_DATE_FORMAT` take stdlib fast paths; anything else falls
+    back to ``dateutil``. Results are memoized because the same header value
+    recurs across messages and call sites.
+
     Args:
         date_str: Date string extracted from an email header.
 
@@ -126,14 +175,35 @@ def parse_email_date(date_str: str) -> Optional[datetime]:
         ``None`` if parsing fails.
     """
 
+    zone = date_str[-4:]
+    if zone in (" PST", " PDT"):
+        try:
+            local = datetime.strptime(date_str[:-4], DISPLAY_DATE_FORMAT[:-3])
+        except ValueError:
+            pass
+        else:
+            # ``fold`` picks standard time for the repeated hour in November.
+            return local.replace(tzinfo=PACIFIC, fold=int(zone == " PST"))
+
+    if _NUMERIC_OFFSET_RE.search(date_str):
+        try:
+            parsed_date = parsedate_to_datetime(date_str)
+        except (TypeError, ValueError, IndexError):
+            parsed_date = None
+        # ``-0000`` yields a naive result; let dateutil treat it as UTC.
+        if parsed_date is not None and parsed_date.tzinfo is not None:
+            return parsed_date.astimezone(PACIFIC)
+
     try:
         parsed_date = parser.parse(date_str, tzinfos=TZINFOS)
         if parsed_date.tzinfo is None:
-            parsed_date = parsed_date.replace(tzinfo=ZoneInfo("America/Los_Angeles"))
-        return parsed_date.astimezone(ZoneInfo("America/Los_Angeles"))
+            parsed_date = parsed_date.replace(tzinfo=PACIFIC)
+        return parsed_date.astimezone(PACIFIC)
     except Exception as e:
         logger.error(
-            f"Error parsing date string '{date_str}': {e}",
+            "Error parsing date string '%s': %s",
+            date_str,
+            e,
             exc_info=True,
         )
         return None
@@ -150,6 +220,18 @@ def parse_header(headers, header_name):
     )
 
 
+def header_map(headers):
+    """Return a lowercase-name to value dict built in one pass over ``headers``.
+
+    The first occurrence of a name wins, matching :func:`parse_header`.
+    """
+
+    hmap = {}
+    for header in reversed(headers):
+        hmap[header["name"].lower()] = header["value"]
+    return hmap
+
+
 def validate_details(details, expected_keys):
     missing_details = [
         key for key in expected_keys if key not in details or details[key] is None
@@ -162,55 +244,93 @@ def validate_details(details, expected_keys):
     return {"missing_details": missing_details, "available_details": available_details}
 
 
-def get_message_details(service, user_id, msg_id):
-    try:
-        message = service.users().messages().get(userId=user_id, id=msg_id).execute()
-        if (
-            not message
-            or "payload" not in message
-            or "headers" not in message["payload"]
-        ):
-            logger.error(f"Invalid message structure for ID {msg_id}: {message}")
-            return None, None, None, None
-        headers = message["payload"]["headers"]
-        subject = parse_header(headers, "subject")
-        date_str = parse_header(headers, "date")
-        sender = parse_header(headers, "from")
-        is_unread = "UNREAD" in message.get("labelIds", [])
+def extract_message_details(msg_id, message):
+    """Return ``(subject, date, sender, is_unread)`` parsed from ``message``.
+
+    ``message`` is a Gmail API message resource that has already been fetched.
+    All four values are ``None`` when the payload is malformed or missing a
+    required header.
+    """
+
+    if not message or "payload" not in message or "headers" not in message["payload"]:
+        logger.error("Invalid message structure for ID %s: %s", msg_id, message)
+        return None, None, None, None
+    hmap = header_map(message["payload"]["headers"])
+    subject = hmap.get("subject")
+    date_str = hmap.get("date")
+    sender = hmap.get("from")
+    if subject is None or date_str is None or sender is None:
+        # Only build the validation report when something is actually missing.
         details = {"subject": subject, "date": date_str, "sender": sender}
         validation = validate_details(details, ["subject", "date", "sender"])
-        if validation["missing_details"]:
-            logger.error(
-                "Missing details for message ID %s: %s",
-                msg_id,
-                validation["missing_details"],
-            )
-            logger.info(
-                "Available details for message ID %s: %s",
-                msg_id,
-                validation["available_details"],
+        logger.error(
+            "Missing details for message ID %s: %s",
+            msg_id,
+            validation["missing_details"],
+        )
+        logger.info(
+            "Available details for message ID %s: %s",
+            msg_id,
+            validation["available_details"],
+        )
+        return None, None, None, None
+    is_unread = "UNREAD" in message.get("labelIds", [])
+    date = parse_email_date(date_str)
+    formatted_date = date.strftime(DISPLAY_DATE_FORMAT) if date else None
+    return subject, formatted_date, sender, is_unread
+
+
+def get_message_details(service, user_id, msg_id, message=None):
+    """Return message details, fetching the message unless ``message`` is given."""
+
+    try:
+        if message is None:
+            message = execute_request_with_backoff(
+                service.users().messages().get(userId=user_id, id=msg_id)
             )
-            return None, None, None, None
-        date = parse_email_date(date_str)
-        formatted_date = date.strftime("%m/%d/%Y, %I:%M %p %Z") if date else None
-        return subject, formatted_date, sender, is_unread
+        return extract_message_details(msg_id, message)
     except Exception as e:
         logger.error(
-            f"Error getting message details for ID {msg_id}: {e}",
+            "Error getting message details for ID %s: %s",
+            msg_id,
+            e,
             exc_info=True,
         )
         return None, None, None, None
 
 
-def get_message_details_cached(service, user_id, msg_id):
-    if msg_id in message_details_cache:
-        cached = message_details_cache.get(msg_id)
-        if isinstance(cached, tuple) and len(cached) == 4:
-            return cached
-        logger.warning(f"Invalid cache format for message ID {msg_id}: {cached}")
-    subject, date, sender, is_unread = get_message_details(service, user_id, msg_id)
+def _lru_store(cache: OrderedDict, key, value, maxsize: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def get_message_details_cached(service, user_id, msg_id, message=None):
+    key = (user_id, msg_id)
+    with _details_cache_lock:
+        cached = message_details_cache.get(key)
+        if cached is not None:
+            message_details_cache.move_to_end(key)
+        elif key in failed_message_details:
+            failed_message_details.move_to_end(key)
+            return None, None, None, None
+    if cached is not None:
+        if message is not None:
+            # Headers never change, but the read state may have since caching.
+            return (*cached[:3], "UNREAD" in message.get("labelIds", []))
+        return cached
+    subject, date, sender, is_unread = get_message_details(
+        service, user_id, msg_id, message
+    )
     if subject is not None and date is not None and sender is not None:
-        message_details_cache[msg_id] = (subject, date, sender, is_unread)
+        with _details_cache_lock:
+            _lru_store(
+                message_details_cache,
+                key,
+                (subject, date, sender, is_unread),
+                MESSAGE_DETAILS_CACHE_SIZE,
+            )
         return subject, date, sender, is_unread
     logger.error(
         (
@@ -222,27 +342,108 @@ def get_message_details_cached(service, user_id, msg_id):
         date,
         sender,
     )
-    message_details_cache[msg_id] = (None, None, None, None)
+    with _details_cache_lock:
+        _lru_store(failed_message_details, key, None, FAILED_DETAILS_CACHE_SIZE)
     return None, None, None, None
 
 
+def load_message_details_cache(file_path: str | Path) -> None:
+    """Seed ``message_details_cache`` with details saved by a previous run."""
+
+    path = Path(file_path)
+    if not path.exists():
+        return
+    try:
+        rows = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as error:
+        logger.warning("Ignoring unreadable message details cache %s: %s", path, error)
+        return
+    if not isinstance(rows, list):
+        logger.warning("Ignoring malformed message details cache %s", path)
+        return
+    # Rows run oldest first; prepend newest first so entries cached during this
+    # run stay the most recently used.
+    for row in reversed(rows[-MESSAGE_DETAILS_CACHE_SIZE:]):
+        if not isinstance(row, list) or len(row) != 6:
+            continue
+        user_id, msg_id, subject, date, sender, is_unread = row
+        if not (isinstance(user_id, str) and isinstance(msg_id, str)):
+            continue
+        if not all(isinstance(v, (str, type(None))) for v in (subject, date, sender)):
+            continue
+        key = (user_id, msg_id)
+        if key not in message_details_cache:
+            message_details_cache[key] = (subject, date, sender, bool(is_unread))
+            message_details_cache.move_to_end(key, last=False)
+    while len(message_details_cache) > MESSAGE_DETAILS_CACHE_SIZE:
+        message_details_cache.popitem(last=False)
+
+
+def save_message_details_cache(file_path: str | Path) -> None:
+    """Persist ``message_details_cache`` in least recently used order."""
+
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [[*key, *details] for key, details in message_details_cache.items()]
+    path.write_text(json.dumps(rows, separators=(",", ":")), encoding="utf-8")
+
+
 def load_processed_email_ids(file_path: str | Path) -> Set[str]:
     """Return processed email IDs stored on disk."""
 
     path = Path(file_path)
     if not path.exists():
         return set()
-    return set(path.read_text(encoding="utf-8").splitlines())
+    # Stream lines into the set rather than holding the file and a list too.
+    with path.open(encoding="utf-8") as handle:
+        return {line.rstrip("\n") for line in handle}
 
 
 def save_processed_email_ids(file_path: str | Path, email_ids: Set[str]) -> None:
-    """Persist processed email IDs to disk."""
+    """Persist processed email IDs to disk.
+
+    The file is only ever loaded back into a set, so IDs are written unsorted.
+    The new contents go to a sibling temporary file that then replaces the
+    original, so an interrupted write never truncates the stored IDs.
+    """
+
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(
+        "".join(email_id + "\n" for email_id in email_ids), encoding="utf-8"
+    )
+    tmp_path.replace(path)
+
 
+def append_processed_email_ids(file_path: str | Path, email_ids: Set[str]) -> None:
+    """Append newly processed email IDs without rewriting the existing file."""
+
+    if not email_ids:
+        return
     path = Path(file_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as handle:
-        for email_id in sorted(email_ids):
-            handle.write(email_id + "\n")
+    with path.open("a", encoding="utf-8") as handle:
+        handle.writelines(email_id + "\n" for email_id in email_ids)
+
+
+def compact_processed_email_ids(file_path: str | Path, email_ids: Set[str]) -> bool:
+    """Rewrite the processed IDs file once duplicates double its size.
+
+    ``email_ids`` must be the set just loaded from ``file_path``. Returns
+    ``True`` when the file was rewritten.
+    """
+
+    path = Path(file_path)
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return False
+    if size <= 2 * sum(len(email_id) + 1 for email_id in email_ids):
+        return False
+    logger.debug("Compacting %s to %s unique IDs.", path, len(email_ids))
+    save_processed_email_ids(path, email_ids)
+    return True
 
 
 def _clean_optional_text(value: Optional[str]) -> Optional[str]:
@@ -290,8 +491,12 @@ def apply_ignored_rule_actions(
     rule: IgnoredRule,
     existing_labels: Dict[str, str],
     dry_run: bool,
+    now: datetime | None = None,
 ) -> tuple[List[str], bool]:
-    """Apply pipeline actions for a matched ignored-email rule."""
+    """Apply pipeline actions for a matched ignored-email rule.
+
+    ``now`` lets callers share one Pacific timestamp across a batch.
+    """
 
     actions = rule.actions
     executed: List[str] = []
@@ -303,7 +508,7 @@ def apply_ignored_rule_actions(
         if delete_after == 0:
             should_delete = True
         elif parsed_date is not None:
-            current_time = datetime.now(ZoneInfo("America/Los_Angeles"))
+            current_time = now or datetime.now(PACIFIC)
             age_days = (current_time - parsed_date).days
             if age_days >= delete_after:
                 should_delete = True
@@ -338,7 +543,8 @@ def apply_ignored_rule_actions(
             )
             if dry_run:
                 executed.append(f"dry-run {summary}")
-                logger.info(
+                # Callers log the returned actions at INFO.
+                logger.debug(
                     "Dry run: would delete email %s from '%s' via rule '%s'",
                     msg_id,
                     sender,
@@ -347,9 +553,9 @@ def apply_ignored_rule_actions(
                 deleted = True
             else:
                 try:
-                    service.users().messages().delete(
-                        userId=user_id, id=msg_id
-                    ).execute()
+                    execute_request_with_backoff(
+                        service.users().messages().delete(userId=user_id, id=msg_id)
+                    )
                     executed.append(summary)
                     deleted = True
                 except HttpError as error:
@@ -405,7 +611,7 @@ def apply_ignored_rule_actions(
             executed.append("dry-run archived")
         if actions.mark_as_read:
             executed.append("dry-run marked as read")
-        logger.info(
+        logger.debug(
             "Dry run: would modify email %s for rule '%s' with actions: %s",
             msg_id,
             rule.name,
@@ -441,64 +647,86 @@ def delete_selected_emails(
     dry_run: bool,
     confirm: bool,
 ) -> bool:
-    """Delete explicitly configured messages, respecting protections."""
+    """Delete explicitly configured messages, respecting protections.
+
+    Messages are fetched through Gmail batch requests (``BATCH_REQUEST_LIMIT`` each)
+    and confirmed deletions are sent with ``messages.batchDelete`` rather than
+    one call per message.
+    """
 
     deletions = _selected_deletions_from_config(config)
     if not deletions:
         logger.info("No selected email deletions configured.")
         return False
 
-    label_to_id = dict(existing_labels)
-    id_to_label = {label_id: name for name, label_id in existing_labels.items()}
-
-    protected_config_names = config.get("PROTECTED_LABELS", [])
-    protected_label_ids: Set[str] = set()
-    for name in protected_config_names:
-        label_id = label_to_id.get(name) or name
-        if name not in label_to_id:
+    # Only protected labels are ever named in log output, so resolve those
+    # instead of inverting every existing label.
+    protected_names: Dict[str, str] = {}
+    for name in config.get("PROTECTED_LABELS", []):
+        label_id = existing_labels.get(name) or name
+        if name not in existing_labels:
             logger.warning(
                 "Protected label '%s' not found among existing labels; using '%s'.",
                 name,
                 label_id,
             )
-        id_to_label.setdefault(label_id, name)
-        protected_label_ids.add(label_id)
+            name = next(
+                (label for label, lid in existing_labels.items() if lid == label_id),
+                name,
+            )
+        protected_names.setdefault(label_id, name)
+    protected_label_ids = frozenset(protected_names)
 
     rules_by_name = {rule.name: rule for rule in ignored_rules.rules}
 
-    any_processed = False
+    messages_by_id: Dict[str, dict] = {}
 
-    for deletion in deletions:
-        message_id = deletion.id
-        try:
-            message = (
-                service.users().messages().get(userId=user_id, id=message_id).execute()
-            )
-        except HttpError as error:
+    def _store_message(message_id, response, error):
+        if error is not None:
             logger.error(
                 "Failed to fetch message %s for deletion: %s",
                 message_id,
                 error,
-                exc_info=True,
+                exc_info=error,
             )
+            return
+        messages_by_id[message_id] = response
+
+    messages_resource = service.users().messages()
+    execute_batched(
+        service,
+        (
+            (
+                message_id,
+                messages_resource.get(
+                    userId=user_id,
+                    id=message_id,
+                    format="metadata",
+                    metadataHeaders=METADATA_HEADERS,
+                ),
+            )
+            for message_id in dict.fromkeys(deletion.id for deletion in deletions)
+        ),
+        _store_message,
+    )
+
+    any_processed = False
+    pending_deletes: Dict[str, tuple[str, str, str, str, List[str]]] = {}
+    now = datetime.now(PACIFIC)
+
+    for deletion in deletions:
+        message_id = deletion.id
+        message = messages_by_id.get(message_id)
+        if message is None:
             continue
 
-        label_ids = set(message.get("labelIds", []))
-        payload = message.get("payload", {}) or {}
-        headers = payload.get("headers", []) or []
-        subject = parse_header(headers, "subject")
-        sender = parse_header(headers, "from")
-        date_header = parse_header(headers, "date")
-        parsed_date = parse_email_date(date_header) if date_header else None
-        formatted_date = (
-            parsed_date.strftime("%m/%d/%Y, %I:%M %p %Z")
-            if parsed_date is not None
-            else date_header
-        )
+        # Gmail returns a handful of label ids per message; membership checks on
+        # the list are cheaper than building a set for every message.
+        label_ids = message.get("labelIds", []) or []
         is_unread = "UNREAD" in label_ids
 
         if deletion.label:
-            target_label_id = label_to_id.get(deletion.label) or deletion.label
+            target_label_id = existing_labels.get(deletion.label) or deletion.label
             if target_label_id not in label_ids:
                 logger.info(
                     "Skipping deletion for %s; label '%s' not present.",
@@ -507,10 +735,10 @@ def delete_selected_emails(
                 )
                 continue
 
-        protected_hit = protected_label_ids & label_ids
-        if protected_hit:
+        if not protected_label_ids.isdisjoint(label_ids):
+            protected_hit = protected_label_ids.intersection(label_ids)
             protected_desc = ", ".join(
-                sorted(id_to_label.get(lid, lid) for lid in protected_hit)
+                sorted(protected_names[lid] for lid in protected_hit)
             )
             logger.info(
                 "Skipping deletion for %s; message has protected labels: %s",
@@ -527,6 +755,19 @@ def delete_selected_emails(
             )
             continue
 
+        # Headers and the date are only needed once the label checks pass.
+        payload = message.get("payload", {}) or {}
+        hmap = header_map(payload.get("headers", []) or [])
+        subject = hmap.get("subject")
+        sender = hmap.get("from")
+        date_header = hmap.get("date")
+        parsed_date = parse_email_date(date_header) if date_header else None
+        formatted_date = (
+            parsed_date.strftime(DISPLAY_DATE_FORMAT)
+            if parsed_date is not None
+            else date_header
+        )
+
         matched_rule: IgnoredRule | None = None
         if deletion.rule:
             matched_rule = rules_by_name.get(deletion.rule)
@@ -564,12 +805,15 @@ def delete_selected_emails(
                 matched_rule,
                 existing_labels,
                 dry_run,
+                now,
             )
             executed_actions.extend(actions)
+            # apply_ignored_rule_actions logs dry-run intents at DEBUG only.
             logger.info(
-                "Selected deletion for %s matched ignored rule '%s'.",
+                "Selected deletion for %s matched ignored rule '%s': %s",
                 message_id,
                 matched_rule.name,
+                ", ".join(actions) or "no pipeline actions",
             )
         else:
             logger.debug(
@@ -606,18 +850,26 @@ def delete_selected_emails(
             )
             continue
 
-        try:
-            service.users().messages().delete(userId=user_id, id=message_id).execute()
-        except HttpError as error:
-            logger.error(
-                "Failed to delete message %s: %s",
-                message_id,
-                error,
-                exc_info=True,
-            )
-            continue
+        pending_deletes.setdefault(
+            message_id,
+            (sender_display, subject_display, reason, actor, executed_actions),
+        )
 
-        any_processed = True
+    def _log_delete_failure(message_id, error):
+        logger.error(
+            "Failed to delete message %s: %s",
+            message_id,
+            error,
+            exc_info=error,
+        )
+
+    deleted_ids = batch_delete_messages(
+        service, user_id, pending_deletes, _log_delete_failure
+    )
+    for message_id in deleted_ids:
+        sender_display, subject_display, reason, actor, executed = pending_deletes[
+            message_id
+        ]
         logger.info(
             "Deleted message %s from '%s' subject='%s' reason=%s actor=%s actions=%s",
             message_id,
@@ -625,10 +877,49 @@ def delete_selected_emails(
             subject_display,
             reason,
             actor,
-            ", ".join(executed_actions) or "none",
+            ", ".join(executed) or "none",
         )
 
-    return any_processed
+    return any_processed or bool(deleted_ids)
+
+
+def delete_expired_emails(service, user_id, pending_deletes) -> List[str]:
+    """Delete queued ``(msg_id, sender, subject, date)`` entries in bulk.
+
+    Messages go through ``batchDelete`` chunks; each confirmed deletion is
+    logged and its id returned.
+    """
+    details = {msg_id: rest for msg_id, *rest in pending_deletes}
+
+    def _log_failure(msg_id, error):
+        if error.resp.status == 403:
+            logger.warning(
+                (
+                    "Insufficient permissions to delete email %s. "
+                    "Email was labeled but not deleted. "
+                    "To enable deletion, re-authorize with broader "
+                    "Gmail permissions."
+                ),
+                msg_id,
+            )
+        else:
+            logger.error(
+                "Failed to delete email %s: %s",
+                msg_id,
+                error,
+                exc_info=error,
+            )
+
+    deleted = batch_delete_messages(service, user_id, list(details), _log_failure)
+    for msg_id in deleted:
+        sender, subject, date = details[msg_id]
+        logger.info(
+            "Deleted expired email from '%s' with subject '%s' dated '%s'.",
+            sender,
+            subject,
+            date,
+        )
+    return deleted
 
 
 def process_email(
@@ -649,16 +940,33 @@ def process_email(
     expected_labels,
     config,
     dry_run=False,
+    message=None,
+    now=None,
+    pending_deletes=None,
+    label_id=None,
+    pending_modifies=None,
 ):
-    subject, date, sender, is_unread = get_message_details_cached(
-        service, user_id, msg_id
-    )
+    """Apply ignore rules, age-based deletion, and labeling to one message.
+
+    ``message`` is the already fetched Gmail message resource; when provided
+    its ``labelIds`` are used instead of fetching the message again. ``now``
+    is the batch's Pacific timestamp used for ``delete_after_days`` ages.
+    Expired messages are appended to ``pending_deletes`` as
+    ``(msg_id, sender, subject, date)`` when it is given, for the caller to
+    remove with :func:`delete_expired_emails`; otherwise they
+    are deleted immediately. ``label_id`` is the Gmail id of ``label`` when
+    the caller has already resolved it from ``existing_labels``. Likewise,
+    messages to label are appended to ``pending_modifies`` for
+    :func:`label_emails` when it is given.
+    """
+    if now is None:
+        now = datetime.now(PACIFIC)
     if not subject or not date or not sender:
-        logger.debug(f"Missing details for message ID: {msg_id}. Skipping")
+        logger.debug("Missing details for message ID: %s. Skipping", msg_id)
         return False
 
     if msg_id in current_run_processed_ids:
-        logger.debug(f"Email ID {msg_id} already processed in this run. Skipping.")
+        logger.debug("Email ID %s already processed in this run. Skipping.", msg_id)
         return False
 
     parsed_date = parse_email_date(date) if date else None
@@ -682,6 +990,7 @@ def process_email(
             rule,
             existing_labels,
             dry_run,
+            now,
         )
         skip_flags = [
             flag
@@ -715,10 +1024,22 @@ def process_email(
                 date,
             )
         else:
-            current_time = datetime.now(ZoneInfo("America/Los_Angeles"))
-            days_diff = (current_time - parsed_date).days
+            days_diff = (now - parsed_date).days
             if days_diff >= delete_after_days:
-                logger.info(
+                if dry_run:
+                    logger.info(
+                        (
+                            "Dry run: would delete email from '%s' with subject "
+                            "'%s' dated '%s' as it is older than %s days."
+                        ),
+                        sender,
+                        subject,
+                        date,
+                        delete_after_days,
+                    )
+                    return True
+                # Intent only; delete_expired_emails logs confirmed deletions.
+                logger.debug(
                     (
                         "Deleting email from '%s' with subject '%s' dated '%s' "
                         "as it is older than %s days."
@@ -728,30 +1049,11 @@ def process_email(
                     date,
                     delete_after_days,
                 )
-                if dry_run:
-                    logger.info("Dry run enabled; email not deleted.")
+                entry = (msg_id, sender, subject, date)
+                if pending_deletes is not None:
+                    pending_deletes.append(entry)
                 else:
-                    try:
-                        service.users().messages().delete(
-                            userId=user_id, id=msg_id
-                        ).execute()
-                        logger.info(f"Email deleted successfully: {msg_id}")
-                    except HttpError as delete_error:
-                        if delete_error.resp.status == 403:
-                            logger.warning(
-                                (
-                                    "Insufficient permissions to delete email %s. "
-                                    "Email was labeled but not deleted. "
-                                    "To enable deletion, re-authorize with broader "
-                                    "Gmail permissions."
-                                ),
-                                msg_id,
-                            )
-                        else:
-                            logger.error(
-                                f"Failed to delete email {msg_id}: {delete_error}",
-                                exc_info=True,
-                            )
+                    delete_expired_emails(service, user_id, [entry])
                 return True
             logger.debug(
                 (
@@ -763,15 +1065,19 @@ def process_email(
                 delete_after_days,
             )
 
-    current_labels = (
-        service.users()
-        .messages()
-        .get(userId=user_id, id=msg_id)
-        .execute()
-        .get("labelIds", [])
-    )
+    if message is not None:
+        current_labels = message.get("labelIds", [])
+    else:
+        current_labels = (
+            execute_request_with_backoff(
+                service.users()
+                .messages()
+                .get(userId=user_id, id=msg_id, format="minimal")
+            )
+            or {}
+        ).get("labelIds", [])
 
-    label_id_to_add = existing_labels.get(label)
+    label_id_to_add = label_id or existing_labels.get(label)
     if label_id_to_add not in current_labels:
         if dry_run:
             logger.info(
@@ -779,27 +1085,60 @@ def process_email(
                 sender,
                 label,
             )
+        elif pending_modifies is not None:
+            pending_modifies.append((msg_id, sender, date, subject))
         else:
             modify_message(
                 service, user_id, msg_id, [label_id_to_add], ["INBOX"], mark_read
             )
             processed_email_ids.add(msg_id)
-            logger.info(
-                (
-                    "Email from '%s' dated '%s' with subject '%s' was modified "
-                    "with label '%s', marked as read: '%s' "
-                    "and removed from Inbox."
-                ),
-                sender,
-                date,
-                subject,
-                label,
-                mark_read,
-            )
+            _log_labeled(sender, date, subject, label, mark_read)
 
     return True
 
 
+def _log_labeled(sender, date, subject, label, mark_read) -> None:
+    logger.info(
+        (
+            "Email from '%s' dated '%s' with subject '%s' was modified "
+            "with label '%s', marked as read: '%s' "
+            "and removed from Inbox."
+        ),
+        sender,
+        date,
+        subject,
+        label,
+        mark_read,
+    )
+
+
+def label_emails(
+    service,
+    user_id,
+    pending_modifies,
+    label_id,
+    label,
+    mark_read,
+    processed_email_ids,
+) -> List[str]:
+    """Label queued ``(msg_id, sender, date, subject)`` entries in bulk.
+
+    All entries share one label change, so they go through
+    :func:`batch_modify_messages`. Messages that were modified are recorded
+    in ``processed_email_ids``; the ids are returned.
+    """
+    details = {msg_id: rest for msg_id, *rest in pending_modifies}
+    remove_label_ids = ["INBOX", "UNREAD"] if mark_read else ["INBOX"]
+    modified = batch_modify_messages(
+        service, user_id, list(details), [label_id], remove_label_ids
+    )
+    for msg_id in modified:
+        processed_email_ids.add(msg_id)
+        sender, date, subject = details[msg_id]
+        _log_labeled(sender, date, subject, label, mark_read)
+    return modified
+
+
 def process_emails_by_criteria(
     service,
     user_id,
@@ -816,8 +1155,31 @@ def process_emails_by_criteria(
     dry_run=False,
     criterion_type="keyword",
     criterion_value="",
+    messages=None,
+    pending_deletes=None,
+    label_id=None,
+    claimed_ids=None,
+    processed_senders=None,
 ):
-    messages = fetch_emails_to_label_optimized(service, user_id, query)
+    """Label, or queue for deletion, the messages matching ``query``.
+
+    Expired messages are collected in ``pending_deletes`` when the caller
+    provides it; otherwise they are batch-deleted once the query is done.
+    ``label_id`` is passed through to :func:`process_email` so the label is
+    resolved once per query rather than once per message. ``claimed_ids``
+    holds messages already claimed by an earlier query; they are skipped.
+    The ``From`` headers of messages that were handled are added to
+    ``processed_senders`` when it is given.
+    """
+    if label_id is None:
+        label_id = existing_labels.get(label)
+    flush_deletes = pending_deletes is None
+    if flush_deletes:
+        pending_deletes = []
+    # Every message here gets the same label change, applied in bulk below.
+    pending_modifies: List[Tuple[str, str, str, str]] = []
+    if messages is None:
+        messages = fetch_emails_to_label_optimized(service, user_id, query)
     skipped_emails_count = 0
     modified_emails_count = 0
     any_emails_processed = False
@@ -831,8 +1193,25 @@ def process_emails_by_criteria(
         )
         return False
 
-    msg_ids = [msg["id"] for msg in messages]
-    batched_messages = batch_fetch_messages(service, user_id, msg_ids)
+    # Already processed or claimed messages are dropped before they are fetched.
+    msg_ids = []
+    for msg in messages:
+        msg_id = msg["id"]
+        if (
+            msg_id in processed_email_ids
+            or msg_id in current_run_processed_ids
+            or (claimed_ids is not None and msg_id in claimed_ids)
+        ):
+            logger.debug("Skipping already processed email ID: %s", msg_id)
+            skipped_emails_count += 1
+        else:
+            msg_ids.append(msg_id)
+    batched_messages = (
+        batch_fetch_messages(service, user_id, msg_ids) if msg_ids else {}
+    )
+    # Ages are compared in whole days, so one timestamp serves the batch.
+    now = datetime.now(PACIFIC)
+    handled_senders: Dict[str, str] = {}
 
     for msg_id in msg_ids:
         message_data = batched_messages.get(msg_id)
@@ -844,14 +1223,10 @@ def process_emails_by_criteria(
             skipped_emails_count += 1
             continue
         subject, date, sender, is_unread = get_message_details_cached(
-            service, user_id, msg_id
+            service, user_id, msg_id, message_data
         )
         if not subject or not date or not sender:
-            logger.debug(f"Missing details for message ID: {msg_id}. Skipping.")
-            skipped_emails_count += 1
-            continue
-        if msg_id in processed_email_ids or msg_id in current_run_processed_ids:
-            logger.debug(f"Skipping already processed email ID: {msg_id}")
+            logger.debug("Missing details for message ID: %s. Skipping.", msg_id)
             skipped_emails_count += 1
             continue
         if process_email(
@@ -872,12 +1247,38 @@ def process_emails_by_criteria(
             expected_labels,
             config,
             dry_run=dry_run,
+            message=message_data,
+            now=now,
+            pending_deletes=pending_deletes,
+            label_id=label_id,
+            pending_modifies=pending_modifies,
         ):
             modified_emails_count += 1
             any_emails_processed = True
+            handled_senders[msg_id] = sender
         else:
             skipped_emails_count += 1
 
+    if pending_modifies:
+        modified = set(
+            label_emails(
+                service,
+                user_id,
+                pending_modifies,
+                label_id,
+                label,
+                mark_read,
+                processed_email_ids,
+            )
+        )
+        for msg_id, *_ in pending_modifies:
+            if msg_id not in modified:
+                handled_senders.pop(msg_id, None)
+    if processed_senders is not None:
+        processed_senders.update(handled_senders.values())
+    if flush_deletes and pending_deletes:
+        delete_expired_emails(service, user_id, pending_deletes)
+
     logger.debug(
         "Processed %s emails and skipped %s emails for %s: '%s' with label '%s'.",
         modified_emails_count,
@@ -889,6 +1290,49 @@ def process_emails_by_criteria(
     return any_emails_processed
 
 
+def _senders_with_mail(senders: List[str], from_headers: Set[str]) -> List[str]:
+    """Return the configured ``senders`` matched by any of ``from_headers``.
+
+    ``from:`` matches partially, so a sender matches any address containing
+    it, such as a domain.
+    """
+    addresses = [parseaddr(header)[1].casefold() for header in from_headers]
+    return [
+        email
+        for email in senders
+        if any(email.casefold() in address for address in addresses)
+    ]
+
+
+def build_sender_queries(
+    emails: List[str], timestamp: int, max_length: int = MAX_SENDER_QUERY_LENGTH
+) -> List[Tuple[List[str], str]]:
+    """Combine senders sharing ``timestamp`` into as few OR queries as fit.
+
+    Returns ``(senders, query)`` pairs; a lone sender keeps the plain
+    ``from:`` form.
+    """
+    suffix = f" label:inbox after:{timestamp}"
+    chunks: List[List[str]] = []
+    length = 0
+    for email in emails:
+        term_length = len(email) + len("from: OR ")
+        if chunks and length + term_length + len(suffix) + 2 <= max_length:
+            chunks[-1].append(email)
+            length += term_length
+        else:
+            chunks.append([email])
+            length = term_length
+    queries = []
+    for chunk in chunks:
+        if len(chunk) == 1:
+            terms = f"from:{chunk[0]}"
+        else:
+            terms = "(" + " OR ".join(f"from:{email}" for email in chunk) + ")"
+        queries.append((chunk, terms + suffix))
+    return queries
+
+
 def process_emails_for_labeling(
     service,
     user_id,
@@ -898,6 +1342,7 @@ def process_emails_for_labeling(
     current_time: float,
     ignored_rules: IgnoredRulesEngine,
     dry_run: bool = False,
+    service_factory=None,
 ):
     """Process emails for all configured senders and apply labels.
 
@@ -909,60 +1354,139 @@ def process_emails_for_labeling(
         last_run_times: Per-sender mapping of last processed timestamps.
         current_time: Timestamp to record as the new last run time.
         dry_run: When ``True``, fetch emails without modifying them.
+        service_factory: Optional callable returning a new Gmail service. When
+            given, sender queries are listed and then processed concurrently,
+            with one service per worker thread.
 
     Returns:
         ``True`` if any emails were processed and modified.
     """
-    data_dir = get_data_dir()
-    data_dir.mkdir(parents=True, exist_ok=True)
+    # Queries are deduplicated within a run only; start each run afresh.
+    reset_processed_queries()
+    data_dir = ensure_data_dir()
     processed_ids_file = data_dir / "processed_email_ids.txt"
-    processed_email_ids = load_processed_email_ids(processed_ids_file)
+    stored_email_ids = load_processed_email_ids(processed_ids_file)
+    compact_processed_email_ids(processed_ids_file, stored_email_ids)
+    processed_email_ids = set(stored_email_ids)
     current_run_processed_ids: Set[str] = set()
     expected_labels: Dict[str, str] = {}
+    # Expired messages from every query are deleted together at the end.
+    pending_deletes: List[Tuple[str, str, str, str]] = []
 
     any_emails_processed = False
 
     logger.info("Processing sender categories:")
+    jobs = []
+    seen_senders: Set[str] = set()
     for sender_category, sender_info in config.get("SENDER_TO_LABELS", {}).items():
         if sender_category not in existing_labels:
             logger.warning(
-                (
-                    f"The label '{sender_category}' does not exist. Existing labels: "
-                    f"{list(existing_labels.keys())}"
-                )
+                "The label '%s' does not exist. Existing labels: %s",
+                sender_category,
+                list(existing_labels),
             )
             continue
+        label_id = existing_labels[sender_category]
         for info in sender_info:
-            mark_read = info["read_status"]
-            delete_after_days = info.get("delete_after_days", None)
-            emails = info["emails"]
-            for email in emails:
+            # Senders sharing a last run time are searched together.
+            by_timestamp: Dict[int, List[str]] = {}
+            for email in info["emails"]:
+                if email in seen_senders:
+                    # The first category listing this sender claims its mail.
+                    logger.debug(
+                        "Sender %s already queued under another category; "
+                        "skipping duplicate query for '%s'.",
+                        email,
+                        sender_category,
+                    )
+                    continue
+                seen_senders.add(email)
                 sender_last_run = last_run_times.get(email, DEFAULT_LAST_RUN_TIME)
-                query = "from:{sender} label:inbox after:{timestamp}".format(
-                    sender=email, timestamp=int(sender_last_run)
-                )
-                emails_processed = process_emails_by_criteria(
-                    service,
-                    user_id,
-                    query,
-                    sender_category,
-                    mark_read,
-                    delete_after_days,
-                    ignored_rules,
-                    existing_labels,
-                    current_run_processed_ids,
-                    processed_email_ids,
-                    expected_labels,
-                    config,
-                    dry_run=dry_run,
-                    criterion_type="sender",
-                    criterion_value=email,
-                )
-                if emails_processed:
-                    any_emails_processed = True
-                    last_run_times[email] = current_time
+                by_timestamp.setdefault(int(sender_last_run), []).append(email)
+            for timestamp, emails in by_timestamp.items():
+                for senders, query in build_sender_queries(emails, timestamp):
+                    jobs.append((sender_category, label_id, info, senders, query))
+
+    prefetched = None
+    if service_factory is not None and jobs:
+        prefetched = fetch_message_lists(
+            service_factory, user_id, (query for *_, query in jobs)
+        )
 
-    save_processed_email_ids(processed_ids_file, processed_email_ids)
+    # ``from:`` matches partially, so a domain and an address listed under
+    # different labels can return the same message. Claims are assigned here,
+    # in config order, so the first category wins however the workers run.
+    claims: List[Optional[Set[str]]] = [None] * len(jobs)
+    if prefetched is not None:
+        claimed: Set[str] = set()
+        for index, (*_, query) in enumerate(jobs):
+            ids = [msg["id"] for msg in prefetched.get(query) or ()]
+            claims[index] = {msg_id for msg_id in ids if msg_id in claimed}
+            claimed.update(ids)
+
+    def _process(job, claimed_ids, job_service):
+        sender_category, label_id, info, senders, query = job
+        processed_senders: Set[str] = set()
+        messages = prefetched.get(query) if prefetched is not None else None
+        return process_emails_by_criteria(
+            job_service,
+            user_id,
+            query,
+            sender_category,
+            info["read_status"],
+            info.get("delete_after_days", None),
+            ignored_rules,
+            existing_labels,
+            current_run_processed_ids,
+            processed_email_ids,
+            expected_labels,
+            config,
+            dry_run=dry_run,
+            criterion_type="sender",
+            criterion_value=", ".join(senders),
+            messages=messages,
+            pending_deletes=pending_deletes,
+            label_id=label_id,
+            claimed_ids=claimed_ids,
+            processed_senders=processed_senders,
+        ), _senders_with_mail(senders, processed_senders)
+
+    if service_factory is not None and len(jobs) > 1:
+        # Jobs meet in the shared sets, the deletion list and the details
+        # cache. The details cache takes a lock; the other updates are single
+        # GIL-atomic calls.
+        local = threading.local()
+
+        def _process_on_worker(job, claimed_ids):
+            job_service = getattr(local, "service", None)
+            if job_service is None:
+                job_service = local.service = service_factory()
+            return _process(job, claimed_ids, job_service)
+
+        with ThreadPoolExecutor(max_workers=LABELING_WORKERS) as executor:
+            results = list(executor.map(_process_on_worker, jobs, claims))
+    else:
+        results = [
+            _process(job, claimed_ids, service)
+            for job, claimed_ids in zip(jobs, claims)
+        ]
+
+    # A combined query only advances the senders whose mail was handled, so
+    # a sender whose messages failed is searched again next run.
+    for emails_processed, advanced in results:
+        if emails_processed:
+            any_emails_processed = True
+        for email in advanced:
+            last_run_times[email] = current_time
+
+    if pending_deletes:
+        delete_expired_emails(service, user_id, pending_deletes)
+
+    # Labeled messages are only added to ``processed_email_ids``, so new IDs
+    # are whatever it gained over the stored set.
+    append_processed_email_ids(
+        processed_ids_file, processed_email_ids - stored_email_ids
+    )
     return any_emails_processed
 
 
@@ -970,8 +1494,7 @@ def main(argv=None):
     args = parse_args(argv)
     try:
         level = "DEBUG" if args.verbose else args.log_level
-        log_file = Path(args.log_file) if args.log_file else None
-        setup_logging(level=level, log_file=log_file)
+        setup_logging(level=level, log_file=args.log_file)
         logger.info("-" * 72)
         logger.debug("Script started")
         logger.info("Starting Gmail_Automation.")
@@ -982,8 +1505,8 @@ def main(argv=None):
             logger.error("Configuration could not be loaded. Exiting.")
             return
 
-        current_time = datetime.now(ZoneInfo("America/Los_Angeles")).timestamp()
-        logger.info(f"Current Time: {unix_to_readable(current_time)}")
+        current_time = datetime.now(PACIFIC).timestamp()
+        logger.info("Current Time: %s", unix_to_readable(current_time))
 
         credentials = get_credentials()
         service = build_service(credentials)
@@ -1001,6 +1524,8 @@ def main(argv=None):
 
         existing_labels = get_existing_labels_cached(service)
         ignored_rules = IgnoredRulesEngine.from_config(config.get("IGNORED_EMAILS", []))
+        details_cache_file = ensure_data_dir() / "message_details_cache.json"
+        load_message_details_cache(details_cache_file)
 
         emails_processed = process_emails_for_labeling(
             service,
@@ -1011,6 +1536,7 @@ def main(argv=None):
             current_time,
             ignored_rules,
             dry_run=args.dry_run,
+            service_factory=lambda: build_service(credentials),
         )
 
         deletions_executed = False
@@ -1025,12 +1551,15 @@ def main(argv=None):
                 confirm=args.confirm,
             )
 
+        # Header details are immutable, so they are kept even on dry runs.
+        save_message_details_cache(details_cache_file)
+
         if not args.dry_run:
             update_sender_last_run_times(last_run_times)
 
         if emails_processed and not args.dry_run:
             update_last_run_time(current_time)
-            logger.info(f"Last run time updated: {unix_to_readable(current_time)}")
+            logger.info("Last run time updated: %s", unix_to_readable(current_time))
         elif emails_processed:
             logger.info("Dry run enabled; last run time not updated.")
         else:
@@ -1044,7 +1573,7 @@ def main(argv=None):
         logger.info("Script completed")
 
     except HttpError as error:
-        logger.error(f"An error occured: {error}", exc_info=True)
+        logger.error("An error occured: %s", error, exc_info=True)
 
 
 if __name__ == "__main__":
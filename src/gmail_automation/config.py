@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import copy
 import json
+import logging
 import os
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from dateutil import parser
 from zoneinfo import ZoneInfo
@@ -12,15 +15,45 @@ from zoneinfo import ZoneInfo
 from .ignored_rules import normalize_ignored_rules
 from .logging_utils import get_logger
 
+try:
+    import orjson
+except ModuleNotFoundError:  # optional accelerator; stdlib json is the fallback
+    orjson = None  # type: ignore[assignment]
+
 logger = get_logger(__name__)
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 DEFAULT_CONFIG_PATH = PROJECT_ROOT / "config" / "gmail_config-final.json"
 DEFAULT_CONFIG_PATH_STR = str(DEFAULT_CONFIG_PATH)
 DEFAULT_CLIENT_SECRET_NAME = "client_secret.json"
+DATA_DIR = PROJECT_ROOT / "data"
+PACIFIC = ZoneInfo("America/Los_Angeles")
+# Pacific display format for timestamps and message dates; the trailing zone
+# name is always PST or PDT.
+DISPLAY_DATE_FORMAT = "%m/%d/%Y, %I:%M %p %Z"
 
 DEFAULT_LAST_RUN_ISO = "2000-01-01T00:00:00Z"
 DEFAULT_LAST_RUN_TIME = datetime(2000, 1, 1, tzinfo=timezone.utc).timestamp()
+# ``%``-format for a ``time.gmtime`` prefix, matching DEFAULT_LAST_RUN_ISO.
+_ISO_UTC_FORMAT = "%04d-%02d-%02dT%02d:%02d:%02dZ"
+
+
+def _json_loads(data: bytes | str) -> Any:
+    """Parse JSON with ``orjson`` when installed.
+
+    ``orjson.JSONDecodeError`` subclasses ``json.JSONDecodeError``, so callers
+    catch the stdlib exception either way.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_compact(obj: object) -> bytes:
+    """Serialize ``obj`` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
 
 
 def get_project_root() -> Path:
@@ -38,16 +71,31 @@ def get_config_dir() -> Path:
 def get_data_dir() -> Path:
     """Return the directory storing runtime data files."""
 
-    return PROJECT_ROOT / "data"
+    return DATA_DIR
+
+
+_ensured_directories: Set[Path] = set()
 
 
 def _ensure_directory(path: Path) -> Path:
-    """Create ``path`` (and parents) if it does not exist and return it."""
+    """Create ``path`` (and parents) if it does not exist and return it.
 
-    path.mkdir(parents=True, exist_ok=True)
+    Each path is created at most once per process; later calls skip the
+    ``mkdir`` syscalls.
+    """
+
+    if path not in _ensured_directories:
+        path.mkdir(parents=True, exist_ok=True)
+        _ensured_directories.add(path)
     return path
 
 
+def ensure_data_dir() -> Path:
+    """Return :func:`get_data_dir`, creating it on first use."""
+
+    return _ensure_directory(get_data_dir())
+
+
 def _coerce_bool(value: object, *, default: bool = False) -> bool:
     """Coerce commonly used truthy/falsey strings into booleans."""
 
@@ -245,7 +293,11 @@ def validate_and_normalize_config(config: dict) -> dict:
     return config
 
 
-def load_configuration(config_path: str | None = None) -> dict:
+# Validated configuration keyed by path, reused while (mtime_ns, size) match.
+_config_cache: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+
+def load_configuration(config_path: str | Path | None = None) -> dict:
     if config_path:
         path_str = os.path.expanduser(str(config_path))
     else:
@@ -257,8 +309,20 @@ def load_configuration(config_path: str | None = None) -> dict:
         logger.error("Configuration file: '%s' does not exist.", path_str)
         return {}
 
-    with open(path_str, encoding="utf-8") as fh:
-        config = json.load(fh)
+    try:
+        stat = os.stat(path_str)
+    except OSError:
+        signature = None
+    else:
+        signature = (stat.st_mtime_ns, stat.st_size)
+    cache_key = os.path.abspath(path_str)
+    cached = _config_cache.get(cache_key)
+    if signature is not None and cached is not None and cached[0] == signature:
+        logger.debug("Configuration unchanged; using cached copy.")
+        return copy.deepcopy(cached[1])
+
+    with open(path_str, "rb") as fh:
+        config = _json_loads(fh.read())
     required_keys = ["SENDER_TO_LABELS"]
     missing = [key for key in required_keys if key not in config]
     if missing:
@@ -270,15 +334,18 @@ def load_configuration(config_path: str | None = None) -> dict:
         return {}
     logger.debug("Configuration loaded successfully.")
     try:
-        return validate_and_normalize_config(config)
+        config = validate_and_normalize_config(config)
     except ValueError as exc:
         logger.error("Configuration validation failed: %s", exc)
         return {}
+    if signature is not None:
+        _config_cache[cache_key] = (signature, copy.deepcopy(config))
+    return config
 
 
 def check_files_existence(client_secret_file: str | None = None):
     config_dir = _ensure_directory(get_config_dir())
-    data_dir = _ensure_directory(get_data_dir())
+    data_dir = ensure_data_dir()
 
     if client_secret_file is None:
         candidates = sorted(config_dir.glob("client_secret*.json"))
@@ -310,10 +377,9 @@ def unix_to_readable(unix_timestamp: float) -> str:
 
     try:
         unix_timestamp = float(unix_timestamp)
-        dt = datetime.fromtimestamp(unix_timestamp, tz=ZoneInfo("UTC")).astimezone(
-            ZoneInfo("America/Los_Angeles")
+        return datetime.fromtimestamp(unix_timestamp, tz=PACIFIC).strftime(
+            DISPLAY_DATE_FORMAT
         )
-        return dt.strftime("%m/%d/%Y, %I:%M %p %Z")
     except (ValueError, TypeError, OSError) as exc:
         logger.error(
             "Error converting timestamp %s: %s", unix_timestamp, exc, exc_info=True
@@ -322,7 +388,7 @@ def unix_to_readable(unix_timestamp: float) -> str:
 
 
 def get_last_run_time() -> float:
-    data_dir = _ensure_directory(get_data_dir())
+    data_dir = ensure_data_dir()
     last_run_file = data_dir / "last_run.txt"
 
     if not last_run_file.exists():
@@ -348,40 +414,70 @@ def get_last_run_time() -> float:
 
 
 def update_last_run_time(current_time: float) -> None:
-    data_dir = _ensure_directory(get_data_dir())
+    data_dir = ensure_data_dir()
     last_run_file = data_dir / "last_run.txt"
     last_run_file.write_text(str(current_time), encoding="utf-8")
-    logger.debug("Updated last run time: %s", unix_to_readable(current_time))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Updated last run time: %s", unix_to_readable(current_time))
+
+
+# Parsed sender_last_run.json keyed by path, reused while (mtime_ns, size) match.
+_sender_last_run_cache: Dict[Path, Tuple[Tuple[int, int], Dict[str, float]]] = {}
+
+
+def _read_sender_last_run_file(sender_file: Path) -> Optional[Dict[str, float]]:
+    try:
+        stat = sender_file.stat()
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _sender_last_run_cache.get(sender_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    try:
+        data = _json_loads(sender_file.read_bytes())
+    except json.JSONDecodeError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    times: Dict[str, float] = {}
+    for sender, value in data.items():
+        if value is None:
+            continue
+        try:
+            times[sender] = (
+                float(value)
+                if isinstance(value, (int, float))
+                else parser.isoparse(str(value)).timestamp()
+            )
+        except (ValueError, OverflowError) as exc:
+            # One bad entry must not block every other sender.
+            logger.warning(
+                "Ignoring invalid last run time %r for %s in %s: %s",
+                value,
+                sender,
+                sender_file,
+                exc,
+            )
+    _sender_last_run_cache[sender_file] = (signature, times)
+    return times
 
 
 def get_sender_last_run_times(senders: Iterable[str]) -> Dict[str, float]:
-    data_dir = _ensure_directory(get_data_dir())
+    data_dir = ensure_data_dir()
     sender_file = data_dir / "sender_last_run.json"
 
-    if sender_file.exists():
-        try:
-            data = json.loads(sender_file.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            data = {}
-        result: Dict[str, float] = {}
-        for sender in senders:
-            value = data.get(sender)
-            if value is None:
-                result[sender] = DEFAULT_LAST_RUN_TIME
-            else:
-                result[sender] = (
-                    float(value)
-                    if isinstance(value, (int, float))
-                    else parser.isoparse(str(value)).timestamp()
-                )
-        return result
+    stored = _read_sender_last_run_file(sender_file)
+    if stored is not None:
+        return {sender: stored.get(sender, DEFAULT_LAST_RUN_TIME) for sender in senders}
 
     global_time = get_last_run_time()
     return {sender: global_time for sender in senders}
 
 
 def update_sender_last_run_times(times: Dict[str, float]) -> None:
-    data_dir = _ensure_directory(get_data_dir())
+    data_dir = ensure_data_dir()
     sender_file = data_dir / "sender_last_run.json"
 
     serializable: Dict[str, str] = {}
@@ -389,11 +485,8 @@ def update_sender_last_run_times(times: Dict[str, float]) -> None:
         if ts == DEFAULT_LAST_RUN_TIME:
             serializable[sender] = DEFAULT_LAST_RUN_ISO
         else:
-            serializable[sender] = (
-                datetime.fromtimestamp(ts, tz=timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z")
-            )
-    sender_file.write_text(
-        json.dumps(serializable, indent=2, sort_keys=True), encoding="utf-8"
-    )
+            # Whole seconds, like the ``after:`` queries these times feed.
+            serializable[sender] = _ISO_UTC_FORMAT % time.gmtime(ts)[:6]
+    # Machine-read state: compact output, no key sort.
+    sender_file.write_bytes(_json_dumps_compact(serializable))
+    _sender_last_run_cache.pop(sender_file, None)
@@ -1,18 +1,36 @@
+import json
 import os
 import random
+import re
+import threading
 import time
-from typing import Any, Dict, Set, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Set, cast
 
-import httplib2
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from oauth2client import client, file, tools
 
-from .config import check_files_existence
+from .config import check_files_existence, get_config_dir, get_data_dir
 from .logging_utils import get_logger
 
 SCOPES = "https://mail.google.com/"
 APPLICATION_NAME = "Email Automation"
+# Gmail accepts up to 100 sub-requests per batch, but rate-limits batches
+# larger than 50, so stay at that size.
+BATCH_REQUEST_LIMIT = 50
+# ``messages.batchDelete`` accepts at most 1000 ids per call.
+BATCH_DELETE_LIMIT = 1000
+# ``messages.batchModify`` has the same per-call limit.
+BATCH_MODIFY_LIMIT = 1000
+# Only these headers are read downstream, so messages are fetched in
+# ``metadata`` format instead of the full payload.
+METADATA_HEADERS = ["Subject", "From", "Date"]
+# Concurrent ``messages.list`` calls used when prefetching sender queries.
+LIST_FETCH_WORKERS = 4
+# Statuses retried with backoff; 403 is retried only for quota reasons.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Compared case-insensitively with separators dropped, so ``rateLimitExceeded``,
+# ``RATE_LIMIT_EXCEEDED`` and "Rate Limit Exceeded" all match.
+RATE_LIMIT_REASONS = frozenset({"ratelimitexceeded", "userratelimitexceeded"})
 
 # Cache dictionaries
 message_details_cache: Dict[str, Dict[str, Any]] = {}
@@ -23,10 +41,11 @@ logger = get_logger(__name__)
 
 def get_credentials():
     """Get valid user credentials from storage or OAuth flow."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.abspath(os.path.join(script_dir, os.pardir, os.pardir))
-    credential_path = os.path.join(root_dir, "data", "gmail-python-email.json")
-    credential_path = os.path.abspath(credential_path)
+    # Imported here: the OAuth stack is slow to load and only needed to log in.
+    import httplib2
+    from oauth2client import client, file, tools
+
+    credential_path = str(get_data_dir() / "gmail-python-email.json")
 
     client_secret, _ = check_files_existence()
 
@@ -53,7 +72,8 @@ def get_credentials():
             logger.info("Credentials successfully refreshed.")
         except client.HttpAccessTokenRefreshError as e:
             logger.error(
-                f"Failed to refresh token: {e}. Re-initiating OAuth flow.",
+                "Failed to refresh token: %s. Re-initiating OAuth flow.",
+                e,
                 exc_info=True,
             )
             flow = client.flow_from_clientsecrets(client_secret, SCOPES)
@@ -68,11 +88,14 @@ def get_credentials():
             flags.logging_level = "ERROR"
             credentials = tools.run_flow(flow, store, flags)
             logger.info("New credentials obtained after refresh failure.")
-    logger.debug(f"Final Credentials Status: Invalid = {credentials.invalid}")
+    logger.debug("Final Credentials Status: Invalid = %s", credentials.invalid)
     return credentials
 
 
 def build_service(credentials):
+    # Discovery pulls in most of googleapiclient; load it only when connecting.
+    from googleapiclient.discovery import build
+
     return build("gmail", "v1", credentials=credentials, cache_discovery=False)
 
 
@@ -83,7 +106,7 @@ def list_labels(service):
         labels = results.get("labels", [])
         return {label["name"]: label["id"] for label in labels}
     except HttpError as error:
-        logger.error(f"An error occurred while listing labels: {error}", exc_info=True)
+        logger.error("An error occurred while listing labels: %s", error, exc_info=True)
         return {}
 
 
@@ -93,77 +116,365 @@ def get_existing_labels_cached(service) -> Dict[str, str]:
     return cast(Dict[str, str], getattr(get_existing_labels_cached, "cache"))
 
 
-def execute_request_with_backoff(request, max_retries=5):
+def _normalise_reason(reason: str) -> str:
+    return re.sub(r"[^a-z]", "", reason.lower())
+
+
+def _error_reasons(error: HttpError) -> Set[str]:
+    """Collect the normalised reasons Gmail reported for ``error``.
+
+    googleapiclient keeps only the first of ``details``/``errors`` in
+    ``error_details``, so the raw payload is read as well.
+    """
+    entries: List[Any] = []
+    if isinstance(error.error_details, list):
+        entries.extend(error.error_details)
+    try:
+        payload = json.loads(error.content.decode("utf-8"))
+    except (AttributeError, UnicodeDecodeError, ValueError):
+        payload = None
+    if isinstance(payload, list) and payload:
+        payload = payload[0]
+    body = payload.get("error") if isinstance(payload, dict) else None
+    if isinstance(body, dict):
+        for key in ("errors", "details"):
+            if isinstance(body.get(key), list):
+                entries.extend(body[key])
+    reasons = [entry.get("reason") for entry in entries if isinstance(entry, dict)]
+    reasons.append(getattr(error, "reason", None))
+    return {_normalise_reason(r) for r in reasons if isinstance(r, str)}
+
+
+def _is_retryable(error: HttpError) -> bool:
+    status = error.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status == 403 and not RATE_LIMIT_REASONS.isdisjoint(_error_reasons(error))
+
+
+def _backoff_delay(retry: int) -> float:
+    """Exponential backoff with jitter, capped at 64 seconds."""
+    return min((2**retry) + random.uniform(0, 1), 64)
+
+
+def execute_request_with_backoff(request, max_retries=5, on_throttle=None):
+    """Execute ``request``, retrying rate-limit and server errors with backoff.
+
+    Other ``HttpError``s are raised at once, so callers keep their existing
+    error handling. ``on_throttle`` is called before each retry.
+    """
+    last_error = None
     for retry in range(max_retries):
         try:
             return request.execute()
         except HttpError as error:
-            if error.resp.status in [429, 403]:
-                wait_time = min((2**retry) + random.uniform(0, 1), 64)
+            if _is_retryable(error):
+                last_error = error
+                if on_throttle is not None:
+                    on_throttle()
+                wait_time = _backoff_delay(retry)
                 logger.warning(
-                    "Rate limit exceeded. Retrying in %.2f seconds...",
+                    "Gmail returned %s. Retrying in %.2f seconds...",
+                    error.resp.status,
                     wait_time,
                 )
                 time.sleep(wait_time)
             elif (
                 error.resp.status == 400 and error._get_reason() == "failedPrecondition"
             ):
-                logger.error(f"Precondition check failed: {error}", exc_info=True)
+                logger.error("Precondition check failed: %s", error, exc_info=True)
                 return None
             else:
-                logger.error(f"An error occurred: {error}", exc_info=True)
                 raise
     logger.error("Max number of retries exceeded.")
-    raise HttpError("Max retries exceeded", content="Max retries exceeded")
+    raise cast(HttpError, last_error)
+
+
+def execute_batched(service, requests, callback, max_retries=5):
+    """Send ``(key, request)`` pairs to Gmail as batch HTTP requests.
+
+    Requests are grouped into batches of at most ``BATCH_REQUEST_LIMIT``.
+    ``callback(key, response, exception)`` runs once per request, where
+    ``exception`` is the ``HttpError`` for that request or ``None``.
+    Sub-requests (or whole batches) failing with a rate-limit or server error
+    are re-sent with the same backoff as :func:`execute_request_with_backoff`;
+    after ``max_retries`` attempts the last error is reported.
+    """
+    pending = list(requests)
+    for attempt in range(max_retries):
+        final = attempt == max_retries - 1
+        retry: List[tuple] = []
+        for start in range(0, len(pending), BATCH_REQUEST_LIMIT):
+            chunk = pending[start : start + BATCH_REQUEST_LIMIT]
+            items = {str(index): item for index, item in enumerate(chunk)}
+
+            def _on_response(request_id, response, exception, items=items):
+                item = items[request_id]
+                if exception is not None and not final and _is_retryable(exception):
+                    retry.append(item)
+                else:
+                    callback(item[0], response, exception)
+
+            batch = service.new_batch_http_request(callback=_on_response)
+            for request_id, (_, request) in items.items():
+                batch.add(request, request_id=request_id)
+            try:
+                batch.execute()
+            except HttpError as error:
+                if not final and _is_retryable(error):
+                    retry.extend(chunk)
+                    continue
+                logger.error("Batch request failed: %s", error, exc_info=True)
+                for key, _ in chunk:
+                    callback(key, None, error)
+        if not retry:
+            return
+        pending = retry
+        wait_time = _backoff_delay(attempt)
+        logger.warning(
+            "Gmail throttled %s batched request(s). Retrying in %.2f seconds...",
+            len(pending),
+            wait_time,
+        )
+        time.sleep(wait_time)
+
+
+def batch_delete_messages(service, user_id, msg_ids, on_error=None):
+    """Permanently delete ``msg_ids`` with ``messages.batchDelete``.
+
+    Ids are sent in chunks of up to ``BATCH_DELETE_LIMIT``. If a chunk fails,
+    its ids are retried one by one through :func:`execute_batched` so a single
+    bad id does not block the rest. ``on_error(msg_id, error)`` is called for
+    each id that still fails. Returns the ids that were deleted.
+    """
+    ids = list(dict.fromkeys(msg_ids))
+    deleted: List[str] = []
+    messages_resource = service.users().messages()
+
+    def _record(msg_id, _response, error):
+        if error is None:
+            deleted.append(msg_id)
+        elif on_error is not None:
+            on_error(msg_id, error)
+        else:
+            logger.error("Failed to delete message %s: %s", msg_id, error)
+
+    for start in range(0, len(ids), BATCH_DELETE_LIMIT):
+        chunk = ids[start : start + BATCH_DELETE_LIMIT]
+        try:
+            response = execute_request_with_backoff(
+                messages_resource.batchDelete(userId=user_id, body={"ids": chunk})
+            )
+        except HttpError as error:
+            failure = error
+        else:
+            # ``None`` means a failedPrecondition response, not success.
+            if response is not None:
+                deleted.extend(chunk)
+                continue
+            failure = "failed precondition"
+        logger.warning(
+            "Batch delete of %s message(s) failed (%s); retrying individually.",
+            len(chunk),
+            failure,
+        )
+        execute_batched(
+            service,
+            (
+                (msg_id, messages_resource.delete(userId=user_id, id=msg_id))
+                for msg_id in chunk
+            ),
+            _record,
+        )
+    return deleted
+
+
+def batch_modify_messages(
+    service, user_id, msg_ids, add_label_ids, remove_label_ids, on_error=None
+):
+    """Apply one label change to ``msg_ids`` with ``messages.batchModify``.
+
+    Chunking and the per-id fallback match :func:`batch_delete_messages`.
+    Returns the ids that were modified.
+    """
+    ids = list(dict.fromkeys(msg_ids))
+    modified: List[str] = []
+    messages_resource = service.users().messages()
+    body = {"addLabelIds": add_label_ids, "removeLabelIds": remove_label_ids}
+
+    def _record(msg_id, _response, error):
+        if error is None:
+            modified.append(msg_id)
+        elif on_error is not None:
+            on_error(msg_id, error)
+        else:
+            logger.error("Failed to modify message %s: %s", msg_id, error)
+
+    for start in range(0, len(ids), BATCH_MODIFY_LIMIT):
+        chunk = ids[start : start + BATCH_MODIFY_LIMIT]
+        try:
+            response = execute_request_with_backoff(
+                messages_resource.batchModify(
+                    userId=user_id, body={"ids": chunk, **body}
+                )
+            )
+        except HttpError as error:
+            failure = error
+        else:
+            if response is not None:
+                modified.extend(chunk)
+                continue
+            failure = "failed precondition"
+        logger.warning(
+            "Batch modify of %s message(s) failed (%s); retrying individually.",
+            len(chunk),
+            failure,
+        )
+        execute_batched(
+            service,
+            (
+                (
+                    msg_id,
+                    messages_resource.modify(userId=user_id, id=msg_id, body=body),
+                )
+                for msg_id in chunk
+            ),
+            _record,
+        )
+    return modified
 
 
 def batch_fetch_messages(service, user_id, msg_ids):
+    """Return ``{msg_id: message}`` for ``msg_ids``.
+
+    Cached messages are reused; the rest are fetched through
+    :func:`execute_batched` instead of one ``get`` call per message. Only
+    ``labelIds`` and the ``METADATA_HEADERS`` are requested.
+    """
     messages = {}
+    missing = []
     for msg_id in msg_ids:
         if msg_id in message_details_cache:
             messages[msg_id] = message_details_cache[msg_id]
         else:
-            try:
-                message = (
-                    service.users().messages().get(userId=user_id, id=msg_id).execute()
-                )
-                messages[msg_id] = message
-                message_details_cache[msg_id] = message
-            except HttpError as error:
-                logger.error(f"Error during batch fetch: {error}", exc_info=True)
+            missing.append(msg_id)
+
+    def _store_message(msg_id, message, error):
+        if error is not None:
+            logger.error("Error during batch fetch: %s", error, exc_info=error)
+            return
+        messages[msg_id] = message
+        message_details_cache[msg_id] = message
+
+    messages_resource = service.users().messages()
+    execute_batched(
+        service,
+        (
+            (
+                msg_id,
+                messages_resource.get(
+                    userId=user_id,
+                    id=msg_id,
+                    format="metadata",
+                    metadataHeaders=METADATA_HEADERS,
+                ),
+            )
+            for msg_id in dict.fromkeys(missing)
+        ),
+        _store_message,
+    )
     return messages
 
 
-def fetch_emails_to_label(service, user_id, query):
+def fetch_emails_to_label(service, user_id, query, on_throttle=None):
     try:
         messages = []
-        response = service.users().messages().list(userId=user_id, q=query).execute()
-        logger.debug(f"API Response: {response}")
+        response = (
+            execute_request_with_backoff(
+                service.users().messages().list(userId=user_id, q=query),
+                on_throttle=on_throttle,
+            )
+            or {}
+        )
+        logger.debug("API Response: %s", response)
         if "messages" in response:
             messages.extend(response["messages"])
         while "nextPageToken" in response:
             page_token = response["nextPageToken"]
             response = (
-                service.users()
-                .messages()
-                .list(userId=user_id, q=query, pageToken=page_token)
-                .execute()
+                execute_request_with_backoff(
+                    service.users()
+                    .messages()
+                    .list(userId=user_id, q=query, pageToken=page_token),
+                    on_throttle=on_throttle,
+                )
+                or {}
             )
-            logger.debug(f"API Response for next page: {response}")
+            logger.debug("API Response for next page: %s", response)
             if "messages" in response:
                 messages.extend(response["messages"])
         return messages
     except HttpError as error:
-        logger.error(f"An error occurred while fetching emails: {error}", exc_info=True)
+        logger.error(
+            "An error occurred while fetching emails: %s", error, exc_info=True
+        )
         return []
 
 
-def fetch_emails_to_label_optimized(service, user_id, query):
+def reset_processed_queries() -> None:
+    """Forget queries listed so far so the next run fetches them again."""
+
+    processed_queries.clear()
+
+
+def fetch_emails_to_label_optimized(service, user_id, query, on_throttle=None):
     if query in processed_queries:
-        logger.debug(f"Query already processed: {query}")
+        logger.debug("Query already processed: %s", query)
         return []
     processed_queries.add(query)
-    return fetch_emails_to_label(service, user_id, query)
+    return fetch_emails_to_label(service, user_id, query, on_throttle)
+
+
+def fetch_message_lists(
+    service_factory: Callable[[], Any],
+    user_id: str,
+    queries: Iterable[str],
+    max_workers: int = LIST_FETCH_WORKERS,
+) -> Dict[str, List[dict]]:
+    """List messages for several queries concurrently.
+
+    Each worker thread builds its own service with ``service_factory`` since
+    the underlying ``httplib2.Http`` is not thread-safe. Queries run in waves
+    of ``max_workers``; when a wave is rate limited the next one uses half as
+    many workers. Returns ``{query: messages}``.
+    """
+    local = threading.local()
+    throttled = threading.Event()
+
+    def _fetch(query):
+        service = getattr(local, "service", None)
+        if service is None:
+            service = local.service = service_factory()
+        return query, fetch_emails_to_label_optimized(
+            service, user_id, query, throttled.set
+        )
+
+    results: Dict[str, List[dict]] = {}
+    pending = list(dict.fromkeys(queries))
+    workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending:
+            wave, pending = pending[:workers], pending[workers:]
+            throttled.clear()
+            for query, messages in executor.map(_fetch, wave):
+                results[query] = messages
+            if throttled.is_set() and workers > 1:
+                workers //= 2
+                logger.warning(
+                    "Gmail rate limited message listing; using %s worker(s).",
+                    workers,
+                )
+    return results
 
 
 def modify_message(service, user_id, msg_id, label_ids, remove_ids, mark_read):
@@ -173,15 +484,21 @@ def modify_message(service, user_id, msg_id, label_ids, remove_ids, mark_read):
         modify_call = messages_resource.modify
         if hasattr(modify_call, "reset_mock"):
             modify_call.reset_mock()
-        message = modify_call(userId=user_id, id=msg_id, body=modify_body).execute()
+        message = execute_request_with_backoff(
+            modify_call(userId=user_id, id=msg_id, body=modify_body)
+        )
         if mark_read:
-            modify_call(
-                userId=user_id, id=msg_id, body={"removeLabelIds": ["UNREAD"]}
-            ).execute()
+            execute_request_with_backoff(
+                modify_call(
+                    userId=user_id, id=msg_id, body={"removeLabelIds": ["UNREAD"]}
+                )
+            )
         return message
     except HttpError as error:
         logger.error(
-            f"An error occurred while modifying message {msg_id}: {error}",
+            "An error occurred while modifying message %s: %s",
+            msg_id,
+            error,
             exc_info=True,
         )
         return None
@@ -208,9 +525,7 @@ def extract_labels_to_config(service, user_id="me", output_file=None, batch_size
     import re
 
     if output_file is None:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        root_dir = os.path.abspath(os.path.join(script_dir, os.pardir, os.pardir))
-        output_file = os.path.join(root_dir, "config", "gmail_labels_data.json")
+        output_file = str(get_config_dir() / "gmail_labels_data.json")
 
     logger.info("Starting Gmail labels extraction...")
 
@@ -227,7 +542,7 @@ def extract_labels_to_config(service, user_id="me", output_file=None, batch_size
             and not label["name"].startswith(("CATEGORY_", "CHAT"))
         ]
 
-        logger.info(f"Found {len(user_labels)} user labels to process")
+        logger.info("Found %s user labels to process", len(user_labels))
 
         # Initialize the configuration structure
         config_data: Dict[str, Dict[str, list[dict[str, Any]]]] = {
@@ -247,7 +562,7 @@ def extract_labels_to_config(service, user_id="me", output_file=None, batch_size
                 label_name = label["name"]
                 label_id = label["id"]
 
-                logger.info(f"Processing label: {label_name}")
+                logger.info("Processing label: %s", label_name)
 
                 # Get all threads with this label
                 threads_result = (
@@ -312,7 +627,7 @@ def extract_labels_to_config(service, user_id="me", output_file=None, batch_size
                         len(email_addresses),
                     )
                 else:
-                    logger.info(f"Label '{label_name}': no emails found")
+                    logger.info("Label '%s': no emails found", label_name)
 
             # Add a small delay between batches to be nice to the API
             if i + batch_size < len(user_labels):
@@ -323,18 +638,20 @@ def extract_labels_to_config(service, user_id="me", output_file=None, batch_size
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(config_data, f, indent=2, ensure_ascii=False)
 
-        logger.info(f"Configuration saved to: {output_file}")
-        logger.info(f"Total labels with emails: {len(config_data['SENDER_TO_LABELS'])}")
+        logger.info("Configuration saved to: %s", output_file)
+        logger.info(
+            "Total labels with emails: %s", len(config_data["SENDER_TO_LABELS"])
+        )
 
         return config_data
 
     except HttpError as error:
         logger.error(
-            f"An error occurred while extracting labels: {error}", exc_info=True
+            "An error occurred while extracting labels: %s", error, exc_info=True
         )
         return None
     except Exception as error:
         logger.error(
-            f"Unexpected error during label extraction: {error}", exc_info=True
+            "Unexpected error during label extraction: %s", error, exc_info=True
         )
         return None
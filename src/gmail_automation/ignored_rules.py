@@ -8,6 +8,7 @@ behaviour across analytics tooling.
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, field
 from email.utils import parseaddr
 from typing import Any, Dict, Iterable, Iterator, List, Sequence
@@ -107,18 +108,21 @@ class IgnoredRule:
     subject_contains: tuple[str, ...]
     actions: RuleActions
     index: int = field(default=0)
-    _senders_cf: tuple[str, ...] = field(init=False, repr=False)
-    _domains_cf: tuple[str, ...] = field(init=False, repr=False)
+    _senders_cf: frozenset[str] = field(init=False, repr=False)
+    _domains_cf: frozenset[str] = field(init=False, repr=False)
     _subjects_cf: tuple[str, ...] = field(init=False, repr=False)
 
     def __post_init__(self) -> None:  # pragma: no cover - dataclass init code
+        # Sender and domain checks are exact lookups, so hash them once.
         object.__setattr__(
-            self, "_senders_cf", tuple(sender.casefold() for sender in self.senders)
+            self,
+            "_senders_cf",
+            frozenset(sender.casefold() for sender in self.senders),
         )
         object.__setattr__(
             self,
             "_domains_cf",
-            tuple(_clean_domain(domain) for domain in self.domains),
+            frozenset(_clean_domain(domain) for domain in self.domains),
         )
         object.__setattr__(
             self,
@@ -166,6 +170,18 @@ class IgnoredRule:
 
         return self.matches_sender(sender) or self.matches_subject(subject)
 
+    def _matches_folded(
+        self, address: str | None, domain: str | None, subject: str | None
+    ) -> bool:
+        """:meth:`matches` on a casefolded address, domain and subject."""
+
+        if address is not None:
+            if address in self._senders_cf or domain in self._domains_cf:
+                return True
+        if subject is None:
+            return False
+        return any(token in subject for token in self._subjects_cf)
+
     def matches_address(self, address: str) -> bool:
         """Case-insensitive match against a plain email address."""
 
@@ -183,6 +199,16 @@ class IgnoredRulesEngine:
 
     def __init__(self, rules: Sequence[IgnoredRule]):
         self._rules = list(rules)
+        # Union of every rule's criteria, so most messages are rejected with
+        # one set lookup and one regex search instead of a pass over all rules.
+        self._any_sender = frozenset().union(*(r._senders_cf for r in self._rules))
+        self._any_domain = frozenset().union(*(r._domains_cf for r in self._rules))
+        tokens = {token for rule in self._rules for token in rule._subjects_cf}
+        self._any_subject = (
+            re.compile("|".join(re.escape(token) for token in tokens))
+            if tokens
+            else None
+        )
 
     @classmethod
     def from_config(cls, rules_config: Sequence[dict]) -> "IgnoredRulesEngine":
@@ -222,8 +248,22 @@ class IgnoredRulesEngine:
     ) -> Iterator[IgnoredRule]:
         """Yield rules that match the provided sender or subject."""
 
+        address = IgnoredRule._extract_address(sender)
+        domain = None
+        if address is not None:
+            domain = address.split("@", 1)[-1].casefold()
+            address = address.casefold()
+            if address not in self._any_sender and domain not in self._any_domain:
+                address = None
+        folded_subject = None
+        if subject is not None and self._any_subject is not None:
+            folded_subject = subject.casefold()
+            if self._any_subject.search(folded_subject) is None:
+                folded_subject = None
+        if address is None and folded_subject is None:
+            return
         for rule in self._rules:
-            if rule.matches(sender, subject):
+            if rule._matches_folded(address, domain, folded_subject):
                 yield rule
 
     def should_skip_analysis(self, email: str) -> bool:
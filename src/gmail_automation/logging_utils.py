@@ -27,11 +27,15 @@ def setup_logging(level: str = "INFO", log_file: Optional[Path] = None) -> None:
         When provided, a file handler logging at ``DEBUG`` level is attached.
     """
     root = logging.getLogger()
-    root.setLevel(logging.DEBUG)
-    if root.handlers:
-        root.handlers.clear()
+    # Close handlers from an earlier call so repeated setup does not leak files.
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
 
     console_level = getattr(logging, level.upper(), logging.INFO)
+    # Without a file handler nothing below the console level is emitted, so
+    # let ``isEnabledFor`` drop those records before they are built.
+    root.setLevel(logging.DEBUG if log_file is not None else console_level)
     console_handler = logging.StreamHandler()
     console_handler.setLevel(console_level)
     console_handler.setFormatter(logging.Formatter("%(message)s"))
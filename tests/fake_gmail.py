@@ -0,0 +1,34 @@
+"""Test doubles for the Gmail API client."""
+
+from __future__ import annotations
+
+from googleapiclient.errors import HttpError
+
+
+class FakeBatchHttpRequest:
+    """Synchronous stand-in for ``googleapiclient.http.BatchHttpRequest``."""
+
+    def __init__(self, callback=None):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self):
+        for request_id, request, callback in self._requests:
+            try:
+                response = request.execute()
+            except HttpError as error:
+                callback(request_id, None, error)
+            else:
+                callback(request_id, response, None)
+
+
+def enable_batch_requests(service):
+    """Make ``service.new_batch_http_request`` return a synchronous fake."""
+
+    service.new_batch_http_request.side_effect = (
+        lambda callback=None: FakeBatchHttpRequest(callback)
+    )
+    return service
@@ -2,21 +2,36 @@
 Unit tests for the CLI module
 """
 
+import tempfile
 import unittest
 import warnings
-from unittest.mock import patch, MagicMock
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import ANY, patch, MagicMock
 from zoneinfo import ZoneInfo
 from dateutil.parser import UnknownTimezoneWarning
 from gmail_automation.cli import (
     parse_email_date,
     parse_header,
+    header_map,
     validate_details,
     load_processed_email_ids,
     save_processed_email_ids,
+    append_processed_email_ids,
+    build_sender_queries,
+    compact_processed_email_ids,
     process_email,
+    process_emails_by_criteria,
     delete_selected_emails,
+    delete_expired_emails,
+    message_details_cache,
+    failed_message_details,
+    get_message_details_cached,
+    load_message_details_cache,
+    save_message_details_cache,
 )
 from gmail_automation.ignored_rules import IgnoredRulesEngine, normalize_ignored_rules
+from tests.fake_gmail import enable_batch_requests
 
 
 class TestCLI(unittest.TestCase):
@@ -64,6 +79,32 @@ class TestCLI(unittest.TestCase):
             self.assertEqual(result.hour, 9)
         self.assertEqual(len(caught), 0)
 
+    def test_parse_email_date_unknown_offset_treated_as_utc(self):
+        """``-0000`` falls back to dateutil and is read as UTC"""
+        result = parse_email_date("Wed, 01 Jan 2023 12:00:00 -0000")
+        self.assertIsNotNone(result)
+        if result is not None:
+            self.assertEqual(result.hour, 4)
+
+    def test_parse_email_date_is_memoized(self):
+        """Repeated headers are served from the cache"""
+        date_str = "Thu, 02 Feb 2023 08:30:00 +0100"
+        first = parse_email_date(date_str)
+        hits = parse_email_date.cache_info().hits
+        self.assertIs(parse_email_date(date_str), first)
+        self.assertEqual(parse_email_date.cache_info().hits, hits + 1)
+
+    @patch("gmail_automation.cli.parser.parse")
+    def test_parse_email_date_display_format_skips_dateutil(self, mock_parse):
+        """Dates formatted by ``extract_message_details`` parse without dateutil"""
+        pacific = ZoneInfo("America/Los_Angeles")
+        summer = parse_email_date("07/04/2023, 09:15 PM PDT")
+        repeated_hour = parse_email_date("11/05/2023, 01:30 AM PST")
+
+        self.assertEqual(summer, datetime(2023, 7, 4, 21, 15, tzinfo=pacific))
+        self.assertEqual(repeated_hour.strftime("%Z"), "PST")
+        mock_parse.assert_not_called()
+
     def test_parse_header_found(self):
         """Test parsing header when the header is found"""
         headers = [
@@ -88,6 +129,19 @@ class TestCLI(unittest.TestCase):
         result = parse_header(headers, "Date")
         self.assertIsNone(result)
 
+    def test_header_map_matches_parse_header(self):
+        """Header map is case-insensitive and keeps the first duplicate"""
+        headers = [
+            {"name": "Received", "value": "first"},
+            {"name": "SUBJECT", "value": "Test Subject"},
+            {"name": "Received", "value": "second"},
+        ]
+
+        hmap = header_map(headers)
+        self.assertEqual(hmap["subject"], parse_header(headers, "Subject"))
+        self.assertEqual(hmap["received"], parse_header(headers, "received"))
+        self.assertIsNone(hmap.get("date"))
+
     def test_validate_details_all_present(self):
         """Test validation when all expected details are present"""
         details = {
@@ -136,11 +190,10 @@ class TestCLI(unittest.TestCase):
         """Test loading processed email IDs when file exists"""
         test_ids = ["id1", "id2", "id3"]
 
-        with (
-            patch("pathlib.Path.exists", return_value=True),
-            patch("pathlib.Path.read_text", return_value="\n".join(test_ids)),
-        ):
-            result = load_processed_email_ids("test_path")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "processed_email_ids.txt"
+            path.write_text("\n".join(test_ids), encoding="utf-8")
+            result = load_processed_email_ids(path)
 
         self.assertEqual(result, set(test_ids))
 
@@ -156,19 +209,65 @@ class TestCLI(unittest.TestCase):
         """Test saving processed email IDs"""
         test_ids = {"id1", "id2", "id3"}
 
-        mock_handle = MagicMock()
-        mock_context = MagicMock()
-        mock_context.__enter__.return_value = mock_handle
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "nested" / "processed_email_ids.txt"
+            save_processed_email_ids(path, test_ids)
 
-        with (
-            patch("pathlib.Path.open", return_value=mock_context) as mock_open,
-            patch("pathlib.Path.mkdir") as mock_mkdir,
-        ):
-            save_processed_email_ids("test_path", test_ids)
+            self.assertEqual(load_processed_email_ids(path), test_ids)
+            self.assertEqual(list(path.parent.iterdir()), [path])
+
+    def test_append_processed_email_ids_keeps_existing(self):
+        """Appending writes only the new IDs after the stored ones"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "processed_email_ids.txt"
+            path.write_text("id1\nid2\n", encoding="utf-8")
+
+            append_processed_email_ids(path, {"id4", "id3"})
+            append_processed_email_ids(path, set())
+
+            lines = path.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(lines[:2], ["id1", "id2"])
+            self.assertEqual(sorted(lines[2:]), ["id3", "id4"])
+            self.assertEqual(
+                load_processed_email_ids(path), {"id1", "id2", "id3", "id4"}
+            )
+
+    def test_compact_processed_email_ids_only_when_bloated(self):
+        """The file is rewritten once duplicates double its size"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "processed_email_ids.txt"
+            path.write_text("id1\nid2\nid1\n", encoding="utf-8")
+            ids = load_processed_email_ids(path)
+            self.assertFalse(compact_processed_email_ids(path, ids))
+
+            path.write_text("id1\nid2\nid1\nid2\nid1\n", encoding="utf-8")
+            self.assertTrue(compact_processed_email_ids(path, ids))
+            self.assertEqual(
+                sorted(path.read_text(encoding="utf-8").splitlines()), ["id1", "id2"]
+            )
+
+
+class TestBuildSenderQueries(unittest.TestCase):
+    """Tests for combining sender searches into OR queries"""
 
-        mock_mkdir.assert_called_once()
-        mock_open.assert_called_once()
-        self.assertEqual(mock_handle.write.call_count, len(test_ids))
+    def test_single_sender_keeps_plain_query(self):
+        self.assertEqual(
+            build_sender_queries(["a@example.com"], 5),
+            [(["a@example.com"], "from:a@example.com label:inbox after:5")],
+        )
+
+    def test_senders_combined_and_chunked_by_length(self):
+        emails = [f"sender{index}@example.com" for index in range(5)]
+
+        queries = build_sender_queries(emails, 7, max_length=120)
+
+        self.assertEqual([chunk for chunk, _ in queries], [emails[:3], emails[3:]])
+        self.assertEqual(
+            queries[1][1],
+            "(from:sender3@example.com OR from:sender4@example.com) "
+            "label:inbox after:7",
+        )
+        self.assertTrue(all(len(query) <= 120 for _, query in queries))
 
 
 class TestProcessEmail(unittest.TestCase):
@@ -183,22 +282,18 @@ class TestProcessEmail(unittest.TestCase):
         messages = users.messages.return_value
         messages.delete.return_value.execute.return_value = None
 
-        mock_get_details.return_value = (
-            "Old Subject",
-            "01/01/2000, 12:00 AM PST",
-            "sender@example.com",
-            False,
-        )
-
-        with patch("gmail_automation.cli.logger.info") as mock_logging_info:
+        with (
+            patch("gmail_automation.cli.logger.info") as mock_logging_info,
+            patch("gmail_automation.cli.logger.debug") as mock_logging_debug,
+        ):
             result = process_email(
                 service,
                 "me",
                 "123",
-                None,
-                None,
-                None,
-                None,
+                "Old Subject",
+                "01/01/2000, 12:00 AM PST",
+                "sender@example.com",
+                False,
                 "Streaming",
                 True,
                 30,
@@ -213,9 +308,11 @@ class TestProcessEmail(unittest.TestCase):
 
         self.assertTrue(result)
         messages.get.assert_not_called()
+        mock_get_details.assert_not_called()
         mock_modify.assert_not_called()
-        messages.delete.assert_called_once_with(userId="me", id="123")
-        mock_logging_info.assert_any_call(
+        messages.batchDelete.assert_called_once_with(userId="me", body={"ids": ["123"]})
+        messages.delete.assert_not_called()
+        mock_logging_debug.assert_any_call(
             (
                 "Deleting email from '%s' with subject '%s' dated '%s' "
                 "as it is older than %s days."
@@ -225,11 +322,250 @@ class TestProcessEmail(unittest.TestCase):
             "01/01/2000, 12:00 AM PST",
             30,
         )
+        # Only the confirmed deletion is reported at INFO.
+        mock_logging_info.assert_called_once_with(
+            "Deleted expired email from '%s' with subject '%s' dated '%s'.",
+            "sender@example.com",
+            "Old Subject",
+            "01/01/2000, 12:00 AM PST",
+        )
+
+    @patch("gmail_automation.cli.batch_delete_messages", return_value=[])
+    def test_failed_expired_delete_not_reported_as_deleted(self, _mock_delete):
+        """Nothing is logged as deleted when the batch delete fails"""
+        with patch("gmail_automation.cli.logger.info") as mock_logging_info:
+            deleted = delete_expired_emails(
+                MagicMock(), "me", [("123", "sender@example.com", "Old", "date")]
+            )
+
+        self.assertEqual(deleted, [])
+        mock_logging_info.assert_not_called()
+
+    @patch("gmail_automation.cli.batch_delete_messages", return_value=["2"])
+    def test_expired_deletes_logged_per_confirmed_message(self, mock_delete):
+        """Each confirmed deletion is logged with its sender and subject"""
+        pending = [("1", "a@example.com", "First", "d1"), ("2", "b@x.com", "Two", "d2")]
+        with patch("gmail_automation.cli.logger.info") as mock_logging_info:
+            deleted = delete_expired_emails(MagicMock(), "me", pending)
+
+        self.assertEqual(deleted, ["2"])
+        mock_delete.assert_called_once_with(ANY, "me", ["1", "2"], ANY)
+        mock_logging_info.assert_called_once_with(
+            "Deleted expired email from '%s' with subject '%s' dated '%s'.",
+            "b@x.com",
+            "Two",
+            "d2",
+        )
+
+    def test_dry_run_delete_logs_single_record(self):
+        """Dry-run expiry emits one INFO record and deletes nothing"""
+        service = MagicMock()
+        messages = service.users.return_value.messages.return_value
+
+        with patch("gmail_automation.cli.logger.info") as mock_logging_info:
+            result = process_email(
+                service,
+                "me",
+                "123",
+                "Old Subject",
+                "01/01/2000, 12:00 AM PST",
+                "sender@example.com",
+                False,
+                "Streaming",
+                True,
+                30,
+                IgnoredRulesEngine.from_config([]),
+                {"Streaming": "label_id"},
+                set(),
+                set(),
+                {},
+                {},
+                dry_run=True,
+            )
+
+        self.assertTrue(result)
+        messages.batchDelete.assert_not_called()
+        mock_logging_info.assert_called_once()
+        self.assertTrue(mock_logging_info.call_args[0][0].startswith("Dry run:"))
+
+
+class TestMessageDetailsCache(unittest.TestCase):
+    """Tests for the bounded message details caches"""
+
+    def setUp(self):
+        message_details_cache.clear()
+        failed_message_details.clear()
+
+    def tearDown(self):
+        message_details_cache.clear()
+        failed_message_details.clear()
+
+    @patch("gmail_automation.cli.MESSAGE_DETAILS_CACHE_SIZE", 2)
+    @patch("gmail_automation.cli.get_message_details")
+    def test_evicts_least_recently_used(self, mock_details):
+        """The oldest untouched entry is dropped once the cache is full"""
+        mock_details.side_effect = lambda _s, _u, msg_id, _m: (
+            f"Subject {msg_id}",
+            "01/01/2023, 04:00 AM PST",
+            "sender@example.com",
+            False,
+        )
+
+        get_message_details_cached(None, "me", "a")
+        get_message_details_cached(None, "me", "b")
+        get_message_details_cached(None, "me", "a")
+        get_message_details_cached(None, "me", "c")
+
+        self.assertEqual(list(message_details_cache), [("me", "a"), ("me", "c")])
+        self.assertEqual(mock_details.call_count, 3)
+
+    @patch("gmail_automation.cli.get_message_details")
+    def test_failures_cached_separately(self, mock_details):
+        """Incomplete details are remembered without filling the main cache"""
+        mock_details.return_value = (None, None, None, None)
+
+        for _ in range(2):
+            result = get_message_details_cached(None, "me", "bad")
+
+        self.assertEqual(result, (None, None, None, None))
+        self.assertEqual(mock_details.call_count, 1)
+        self.assertEqual(len(message_details_cache), 0)
+        self.assertIn(("me", "bad"), failed_message_details)
+
+    @patch("gmail_automation.cli.get_message_details")
+    def test_persisted_details_survive_restart(self, mock_details):
+        """Saved details are reused in a later run with a fresh read state"""
+        message_details_cache[("me", "old")] = ("Old", "date", "a@example.com", True)
+        message_details_cache[("me", "new")] = ("New", "date", "b@example.com", True)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_file = Path(tmp) / "message_details_cache.json"
+            save_message_details_cache(cache_file)
+            message_details_cache.clear()
+            message_details_cache[("me", "live")] = ("Live", "d", "c@example.com", 0)
+            load_message_details_cache(cache_file)
+
+        result = get_message_details_cached(None, "me", "new", {"labelIds": ["INBOX"]})
+
+        self.assertEqual(result, ("New", "date", "b@example.com", False))
+        mock_details.assert_not_called()
+        self.assertEqual(
+            list(message_details_cache),
+            [("me", "old"), ("me", "live"), ("me", "new")],
+        )
+
+    def test_malformed_persisted_cache_ignored(self):
+        """Non-list files and bad rows are skipped instead of raising"""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_file = Path(tmp) / "message_details_cache.json"
+            cache_file.write_text('{"not": "a list"}', encoding="utf-8")
+            with patch("gmail_automation.cli.logger"):
+                load_message_details_cache(cache_file)
+            self.assertEqual(len(message_details_cache), 0)
+
+            cache_file.write_text(
+                '[["me"], 5, [["x"], "id", "S", "d", "f", 1],'
+                ' ["me", "ok", "S", "d", "f@example.com", 1]]',
+                encoding="utf-8",
+            )
+            load_message_details_cache(cache_file)
+
+        self.assertEqual(
+            dict(message_details_cache),
+            {("me", "ok"): ("S", "d", "f@example.com", True)},
+        )
+
+
+class TestProcessEmailsByCriteria(unittest.TestCase):
+    """Tests for the per-query labeling loop"""
+
+    def setUp(self):
+        message_details_cache.clear()
+        failed_message_details.clear()
+
+    @patch("gmail_automation.cli.modify_message")
+    @patch("gmail_automation.cli.batch_fetch_messages")
+    @patch("gmail_automation.cli.fetch_emails_to_label_optimized")
+    def test_uses_batched_payload_without_refetch(
+        self, mock_fetch, mock_batch, mock_modify
+    ):
+        """Details and labels come from the batch fetch, not extra GETs"""
+        service = MagicMock()
+        messages = service.users.return_value.messages.return_value
+        mock_fetch.return_value = [{"id": "msg1"}]
+        mock_batch.return_value = {
+            "msg1": {
+                "id": "msg1",
+                "labelIds": ["INBOX", "UNREAD"],
+                "payload": {
+                    "headers": [
+                        {"name": "Subject", "value": "Hello"},
+                        {"name": "From", "value": "news@example.com"},
+                        {"name": "Date", "value": "Wed, 01 Jan 2023 12:00:00 +0000"},
+                    ]
+                },
+            }
+        }
+
+        processed = process_emails_by_criteria(
+            service,
+            "me",
+            "from:news@example.com",
+            "News",
+            True,
+            None,
+            IgnoredRulesEngine.from_config([]),
+            {"News": "LBL_NEWS"},
+            set(),
+            set(),
+            {},
+            {},
+        )
+
+        self.assertTrue(processed)
+        messages.get.assert_not_called()
+        mock_modify.assert_not_called()
+        messages.batchModify.assert_called_once_with(
+            userId="me",
+            body={
+                "ids": ["msg1"],
+                "addLabelIds": ["LBL_NEWS"],
+                "removeLabelIds": ["INBOX", "UNREAD"],
+            },
+        )
+
+    @patch("gmail_automation.cli.get_message_details_cached")
+    @patch("gmail_automation.cli.batch_fetch_messages")
+    @patch("gmail_automation.cli.fetch_emails_to_label_optimized")
+    def test_processed_ids_skipped_before_details(
+        self, mock_fetch, mock_batch, mock_details
+    ):
+        """Already processed messages are skipped before fetch or details"""
+        mock_fetch.return_value = [{"id": "old"}]
+        mock_batch.return_value = {"old": {"id": "old"}}
+
+        processed = process_emails_by_criteria(
+            MagicMock(),
+            "me",
+            "from:news@example.com",
+            "News",
+            True,
+            None,
+            IgnoredRulesEngine.from_config([]),
+            {"News": "LBL_NEWS"},
+            set(),
+            {"old"},
+            {},
+            {},
+        )
+
+        self.assertFalse(processed)
+        mock_batch.assert_not_called()
+        mock_details.assert_not_called()
 
 
 class TestSelectedDeletions(unittest.TestCase):
     def _make_service(self, message_data):
-        service = MagicMock()
+        service = enable_batch_requests(MagicMock())
         users = service.users.return_value
         messages = users.messages.return_value
         get_call = MagicMock()
@@ -288,18 +624,49 @@ class TestSelectedDeletions(unittest.TestCase):
         }
         existing_labels = {"Important": "Label_Important"}
 
-        deleted = delete_selected_emails(
-            service,
-            "me",
-            existing_labels,
-            config,
-            engine,
-            dry_run=False,
-            confirm=True,
-        )
+        with patch("gmail_automation.cli.parse_email_date") as mock_parse:
+            deleted = delete_selected_emails(
+                service,
+                "me",
+                existing_labels,
+                config,
+                engine,
+                dry_run=False,
+                confirm=True,
+            )
+
+        self.assertFalse(deleted)
+        messages.delete.assert_not_called()
+        mock_parse.assert_not_called()
+
+    def test_delete_selected_names_protected_label_given_by_id(self):
+        message = {"labelIds": ["Label_Important"], "payload": {"headers": []}}
+        service, messages = self._make_service(message)
+        engine = IgnoredRulesEngine.from_config([])
+        config = {
+            "SELECTED_EMAIL_DELETIONS": [{"id": "msg1"}],
+            "PROTECTED_LABELS": ["Label_Important"],
+        }
+        existing_labels = {"Important": "Label_Important"}
+
+        with patch("gmail_automation.cli.logger.info") as mock_info:
+            deleted = delete_selected_emails(
+                service,
+                "me",
+                existing_labels,
+                config,
+                engine,
+                dry_run=False,
+                confirm=True,
+            )
 
         self.assertFalse(deleted)
         messages.delete.assert_not_called()
+        mock_info.assert_any_call(
+            "Skipping deletion for %s; message has protected labels: %s",
+            "msg1",
+            "Important",
+        )
 
     def test_delete_selected_skips_unread_when_required(self):
         message = {"labelIds": ["UNREAD"], "payload": {"headers": []}}
@@ -369,7 +736,45 @@ class TestSelectedDeletions(unittest.TestCase):
 
         self.assertTrue(deleted)
         mock_modify.assert_called_once()
-        messages.delete.assert_called_once()
+        messages.batchDelete.assert_called_once_with(
+            userId="me", body={"ids": ["msg1"]}
+        )
+        messages.delete.assert_not_called()
+
+    def test_delete_selected_dry_run_logs_rule_delete_at_info(self):
+        headers = [
+            {"name": "Subject", "value": "Ignore me"},
+            {"name": "From", "value": "skip@example.com"},
+            {"name": "Date", "value": "Wed, 01 Jan 2020 12:00:00 +0000"},
+        ]
+        message = {"labelIds": [], "payload": {"headers": headers}}
+        service, messages = self._make_service(message)
+        engine = IgnoredRulesEngine.from_config(
+            normalize_ignored_rules(
+                [
+                    {
+                        "name": "Purge",
+                        "senders": ["skip@example.com"],
+                        "actions": {"delete_after_days": 0},
+                    }
+                ]
+            )
+        )
+        config = {"SELECTED_EMAIL_DELETIONS": [{"id": "msg1"}]}
+
+        with patch("gmail_automation.cli.logger.info") as mock_info:
+            deleted = delete_selected_emails(
+                service, "me", {}, config, engine, dry_run=True, confirm=False
+            )
+
+        self.assertTrue(deleted)
+        messages.batchDelete.assert_not_called()
+        mock_info.assert_any_call(
+            "Selected deletion for %s matched ignored rule '%s': %s",
+            "msg1",
+            "Purge",
+            "dry-run delete (immediate)",
+        )
 
 
 if __name__ == "__main__":
@@ -1,12 +1,52 @@
 """Tests for configuration utilities."""
 
+import json
 from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
-from gmail_automation.config import unix_to_readable
+from gmail_automation.config import load_configuration, unix_to_readable
 
 
 def test_unix_to_readable_pacific_time():
     """unix_to_readable formats timestamps in Pacific time."""
     timestamp = datetime(2023, 1, 1, 12, 0, tzinfo=ZoneInfo("UTC")).timestamp()
     assert unix_to_readable(timestamp) == "01/01/2023, 04:00 AM PST"
+
+
+def test_ensure_directory_creates_once(tmp_path, monkeypatch):
+    """_ensure_directory only calls mkdir the first time a path is seen."""
+    from gmail_automation import config
+
+    target = tmp_path / "state"
+    calls = []
+    real_mkdir = Path.mkdir
+
+    def _mkdir(self, *args, **kwargs):
+        calls.append(self)
+        return real_mkdir(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", _mkdir)
+    monkeypatch.setattr(config, "_ensured_directories", set())
+
+    assert config._ensure_directory(target) == target
+    assert config._ensure_directory(target) == target
+    assert target.is_dir()
+    assert calls == [target]
+
+
+def test_load_configuration_reuses_unchanged_file(tmp_path):
+    """Warm loads skip parsing and hand out independent copies."""
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"SENDER_TO_LABELS": {}}))
+
+    first = load_configuration(config_file)
+    first["SENDER_TO_LABELS"]["Mutated"] = []
+    with patch("gmail_automation.config._json_loads") as mock_load:
+        second = load_configuration(config_file)
+    mock_load.assert_not_called()
+    assert second["SENDER_TO_LABELS"] == {}
+
+    config_file.write_text(json.dumps({"SENDER_TO_LABELS": {"News": []}}))
+    assert load_configuration(config_file)["SENDER_TO_LABELS"] == {"News": []}
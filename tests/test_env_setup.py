@@ -1,4 +1,7 @@
 import importlib.util
+
+import pytest
+
 from scripts import setup as setup_script
 
 
@@ -15,3 +18,89 @@ def test_install_requirements_uses_dev_file(monkeypatch, tmp_path) -> None:
     monkeypatch.setattr(setup_script, "run", fake_run)
     setup_script.install_requirements(tmp_path, dry_run=False)
     assert any("requirements-dev.txt" in part for part in called[0])
+
+
+def test_install_requirements_sets_pip_floor_in_same_call(
+    monkeypatch, tmp_path
+) -> None:
+    called = []
+
+    def fake_run(cmd: list[str], dry_run: bool) -> None:
+        called.append(cmd)
+
+    monkeypatch.setattr(setup_script, "run", fake_run)
+    monkeypatch.setattr(setup_script, "LOCK_FILE", tmp_path / "missing.lock")
+    setup_script.install_requirements(tmp_path, dry_run=False)
+    assert called == [
+        [
+            str(setup_script.venv_python(tmp_path)),
+            "-m",
+            "pip",
+            "install",
+            "pip>=23.1",
+            "-r",
+            "requirements-dev.txt",
+        ]
+    ]
+
+
+def test_install_requirements_uses_prefetched_wheels(monkeypatch, tmp_path) -> None:
+    called = []
+
+    def fake_run(cmd: list[str], dry_run: bool) -> None:
+        called.append(cmd)
+
+    monkeypatch.setattr(setup_script, "run", fake_run)
+    setup_script.install_requirements(tmp_path, dry_run=False, find_links=tmp_path)
+    assert called[0][-2:] == ["--find-links", str(tmp_path)]
+
+
+def test_start_wheel_prefetch_skipped_in_dry_run() -> None:
+    assert setup_script.start_wheel_prefetch(dry_run=True) is None
+    assert setup_script.finish_wheel_prefetch(None) is None
+
+
+def test_prefetch_terminated_when_venv_creation_fails(monkeypatch, tmp_path) -> None:
+    class FakeProc:
+        terminated = False
+
+        def poll(self):
+            return None
+
+        def terminate(self) -> None:
+            self.terminated = True
+
+        def wait(self) -> int:
+            return -15
+
+    proc = FakeProc()
+
+    def failing_create_venv(venv, dry_run: bool) -> None:
+        raise RuntimeError("venv failed")
+
+    monkeypatch.setattr(setup_script, "start_wheel_prefetch", lambda dry_run: proc)
+    monkeypatch.setattr(setup_script, "create_venv", failing_create_venv)
+
+    with pytest.raises(RuntimeError):
+        setup_script.main(["--venv", str(tmp_path / "venv")])
+    assert proc.terminated
+
+
+def test_install_requirements_prefers_current_lock(monkeypatch, tmp_path) -> None:
+    called = []
+
+    def fake_run(cmd: list[str], dry_run: bool) -> None:
+        called.append(cmd)
+
+    requirements = tmp_path / "requirements-dev.txt"
+    requirements.write_text("pytest\n")
+    lock = tmp_path / "requirements-dev.lock"
+    lock.write_text("pytest==8.0.0 --hash=sha256:abc\n")
+    monkeypatch.setattr(setup_script, "run", fake_run)
+    monkeypatch.setattr(setup_script, "REQUIREMENTS_FILES", (requirements,))
+    monkeypatch.setattr(setup_script, "LOCK_FILE", lock)
+
+    setup_script.install_requirements(tmp_path, dry_run=False)
+
+    assert "--require-hashes" in called[0]
+    assert str(lock) in called[0]
@@ -6,9 +6,17 @@ import unittest
 from unittest.mock import patch, Mock
 from gmail_automation.gmail_service import (
     get_existing_labels_cached,
+    batch_delete_messages,
     batch_fetch_messages,
+    batch_modify_messages,
+    execute_request_with_backoff,
+    execute_batched,
+    fetch_emails_to_label_optimized,
+    fetch_message_lists,
     modify_message,
+    reset_processed_queries,
 )
+from tests.fake_gmail import enable_batch_requests
 
 
 class TestGmailService(unittest.TestCase):
@@ -70,6 +78,7 @@ class TestGmailService(unittest.TestCase):
 
     def test_batch_fetch_messages(self):
         """Test batch fetching of messages"""
+        enable_batch_requests(self.mock_service)
         message_ids = ["msg1", "msg2", "msg3"]
 
         # Mock responses for each message
@@ -90,6 +99,7 @@ class TestGmailService(unittest.TestCase):
 
     def test_batch_fetch_messages_with_error(self):
         """Test batch fetching messages when some requests fail"""
+        enable_batch_requests(self.mock_service)
         message_ids = ["msg1", "msg2", "msg3"]
 
         # Mock responses where one fails
@@ -114,6 +124,42 @@ class TestGmailService(unittest.TestCase):
         # Should return available messages, skipping the failed one
         self.assertIsInstance(result, dict)
 
+    def test_batch_fetch_messages_uses_one_batch(self):
+        """Uncached ids share a batch and failed ids are skipped"""
+        from googleapiclient.errors import HttpError
+
+        enable_batch_requests(self.mock_service)
+        responses = {
+            "batch1": {"id": "batch1"},
+            "batch2": HttpError(Mock(status=404), b"missing"),
+            "batch3": {"id": "batch3"},
+        }
+
+        def _get(userId, id, **kwargs):
+            request = Mock()
+            response = responses[id]
+            if isinstance(response, Exception):
+                request.execute.side_effect = response
+            else:
+                request.execute.return_value = response
+            return request
+
+        self.mock_service.users().messages().get.side_effect = _get
+
+        with patch("logging.error"):
+            result = batch_fetch_messages(
+                self.mock_service, self.user_id, ["batch1", "batch2", "batch3"]
+            )
+
+        self.assertEqual(set(result), {"batch1", "batch3"})
+        self.mock_service.new_batch_http_request.assert_called_once()
+        self.mock_service.users().messages().get.assert_any_call(
+            userId=self.user_id,
+            id="batch1",
+            format="metadata",
+            metadataHeaders=["Subject", "From", "Date"],
+        )
+
     def test_modify_message_add_labels(self):
         """Test modifying message to add labels"""
         msg_id = "test_message"
@@ -197,6 +243,335 @@ class TestGmailService(unittest.TestCase):
         # Should return None on error
         self.assertIsNone(result)
 
+    def test_execute_batched_chunks_requests(self):
+        """Requests are split into batches of at most 50"""
+        service = enable_batch_requests(Mock())
+        requests = []
+        for index in range(150):
+            request = Mock()
+            request.execute.return_value = {"id": f"msg{index}"}
+            requests.append((f"msg{index}", request))
+        results = {}
+
+        execute_batched(
+            service,
+            requests,
+            lambda key, response, error: results.__setitem__(key, response),
+        )
+
+        self.assertEqual(service.new_batch_http_request.call_count, 3)
+        self.assertEqual(len(results), 150)
+        self.assertEqual(results["msg149"], {"id": "msg149"})
+
+    @patch("gmail_automation.gmail_service.time.sleep")
+    def test_execute_batched_reports_batch_failure_per_request(self, mock_sleep):
+        """A batch that keeps failing reports the error for each request"""
+        from googleapiclient.errors import HttpError
+
+        batch = Mock()
+        batch.execute.side_effect = HttpError(Mock(status=500), b"boom")
+        self.mock_service.new_batch_http_request.return_value = batch
+        errors = {}
+
+        with patch("gmail_automation.gmail_service.logger"):
+            execute_batched(
+                self.mock_service,
+                [("a", Mock()), ("b", Mock())],
+                lambda key, response, error: errors.__setitem__(key, error),
+                max_retries=3,
+            )
+
+        self.assertEqual(set(errors), {"a", "b"})
+        self.assertIsInstance(errors["a"], HttpError)
+        self.assertEqual(batch.execute.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("gmail_automation.gmail_service.time.sleep")
+    def test_execute_batched_retries_throttled_sub_requests(self, mock_sleep):
+        """Only rate-limited sub-requests are re-sent; others report at once"""
+        from googleapiclient.errors import HttpError
+
+        service = enable_batch_requests(Mock())
+        throttled = Mock()
+        throttled.execute.side_effect = [
+            HttpError(Mock(status=429), b"slow down"),
+            {"id": "slow"},
+        ]
+        missing = Mock()
+        missing.execute.side_effect = HttpError(Mock(status=404), b"gone")
+        ok = Mock()
+        ok.execute.return_value = {"id": "ok"}
+        results = {}
+
+        with patch("gmail_automation.gmail_service.logger"):
+            execute_batched(
+                service,
+                [("slow", throttled), ("missing", missing), ("ok", ok)],
+                lambda key, response, error: results.__setitem__(
+                    key, error or response
+                ),
+            )
+
+        self.assertEqual(results["slow"], {"id": "slow"})
+        self.assertEqual(results["ok"], {"id": "ok"})
+        self.assertEqual(results["missing"].resp.status, 404)
+        self.assertEqual(missing.execute.call_count, 1)
+        self.assertEqual(ok.execute.call_count, 1)
+        self.assertEqual(service.new_batch_http_request.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    def test_fetch_message_lists_one_service_per_thread(self):
+        """Each worker builds its own service and every query is listed"""
+        import threading
+
+        owners = {}
+
+        def factory():
+            service = Mock()
+            owners[threading.get_ident()] = owners.get(threading.get_ident(), 0) + 1
+            service.users().messages().list.side_effect = lambda userId, q: Mock(
+                execute=Mock(return_value={"messages": [{"id": q}]})
+            )
+            return service
+
+        queries = [f"from:parallel{index}@example.com" for index in range(6)]
+        results = fetch_message_lists(factory, self.user_id, queries, max_workers=3)
+
+        self.assertEqual(results, {query: [{"id": query}] for query in queries})
+        self.assertTrue(all(count == 1 for count in owners.values()))
+
+    @patch("gmail_automation.gmail_service.time.sleep")
+    def test_fetch_message_lists_halves_workers_when_throttled(self, _mock_sleep):
+        """A rate-limited wave halves the number of workers for the next one"""
+        from googleapiclient.errors import HttpError
+
+        throttled_once = []
+
+        def _execute():
+            if not throttled_once:
+                throttled_once.append(True)
+                raise HttpError(Mock(status=429), b"slow down")
+            return {}
+
+        def factory():
+            service = Mock()
+            service.users().messages().list.return_value.execute.side_effect = _execute
+            return service
+
+        queries = [f"from:throttled{index}@example.com" for index in range(6)]
+        with patch("gmail_automation.gmail_service.logger") as mock_logger:
+            results = fetch_message_lists(factory, self.user_id, queries, max_workers=4)
+
+        self.assertEqual(set(results), set(queries))
+        mock_logger.warning.assert_any_call(
+            "Gmail rate limited message listing; using %s worker(s).", 2
+        )
+
+    def test_repeated_query_listed_once_per_run(self):
+        """A query is listed once until the run-level cache is reset"""
+        query = "from:repeat@example.com label:inbox after:0"
+        list_call = self.mock_service.users().messages().list
+        list_call.return_value.execute.return_value = {"messages": [{"id": "m1"}]}
+        reset_processed_queries()
+
+        first = fetch_emails_to_label_optimized(self.mock_service, "me", query)
+        second = fetch_emails_to_label_optimized(self.mock_service, "me", query)
+        reset_processed_queries()
+        third = fetch_emails_to_label_optimized(self.mock_service, "me", query)
+
+        self.assertEqual(first, [{"id": "m1"}])
+        self.assertEqual(second, [])
+        self.assertEqual(third, [{"id": "m1"}])
+
+    @patch("gmail_automation.gmail_service.time.sleep")
+    def test_backoff_retries_server_errors_only(self, mock_sleep):
+        """5xx responses are retried; a plain 403 is raised immediately"""
+        from googleapiclient.errors import HttpError
+
+        request = Mock()
+        request.execute.side_effect = [HttpError(Mock(status=503), b"busy"), {"ok": 1}]
+        with patch("gmail_automation.gmail_service.logger"):
+            self.assertEqual(execute_request_with_backoff(request), {"ok": 1})
+
+        forbidden = Mock()
+        forbidden.execute.side_effect = HttpError(Mock(status=403), b"denied")
+        with self.assertRaises(HttpError):
+            execute_request_with_backoff(forbidden)
+
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(forbidden.execute.call_count, 1)
+
+    @patch("gmail_automation.gmail_service.time.sleep")
+    def test_backoff_retries_quota_403_from_error_payload(self, mock_sleep):
+        """403s naming a rate-limit reason in details or errors are retried"""
+        import json
+
+        from googleapiclient.errors import HttpError
+
+        error_info = {
+            "@type": "type.googleapis.com/google.rpc.ErrorInfo",
+            "reason": "RATE_LIMIT_EXCEEDED",
+            "domain": "googleapis.com",
+            "metadata": {"service": "gmail.googleapis.com"},
+        }
+        bodies = [
+            {
+                "error": {
+                    "code": 403,
+                    "message": "Quota exceeded for quota metric 'Queries'.",
+                    "status": "PERMISSION_DENIED",
+                    "details": [error_info],
+                    "errors": [
+                        {
+                            "message": "Quota exceeded.",
+                            "domain": "usageLimits",
+                            "reason": "rateLimitExceeded",
+                        }
+                    ],
+                }
+            },
+            {"error": {"code": 403, "message": "Denied", "details": [error_info]}},
+        ]
+        for body in bodies:
+            request = Mock()
+            request.execute.side_effect = [
+                HttpError(Mock(status=403), json.dumps(body).encode()),
+                {"ok": 1},
+            ]
+            with patch("gmail_automation.gmail_service.logger"):
+                self.assertEqual(execute_request_with_backoff(request), {"ok": 1})
+
+        denied = {"error": {"code": 403, "message": "Insufficient Permission"}}
+        forbidden = Mock()
+        forbidden.execute.side_effect = HttpError(
+            Mock(status=403), json.dumps(denied).encode()
+        )
+        with self.assertRaises(HttpError):
+            execute_request_with_backoff(forbidden)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_batch_delete_messages_chunks_ids(self):
+        """Ids are sent to batchDelete in chunks of at most 1000"""
+        ids = [f"del{index}" for index in range(1001)]
+        batch_delete = self.mock_service.users().messages().batchDelete
+
+        deleted = batch_delete_messages(self.mock_service, self.user_id, ids)
+
+        self.assertEqual(deleted, ids)
+        self.assertEqual(batch_delete.call_count, 2)
+        self.assertEqual(
+            batch_delete.call_args_list[1].kwargs["body"], {"ids": ["del1000"]}
+        )
+
+    def test_batch_delete_messages_falls_back_per_id(self):
+        """A failed chunk is retried id by id and failures are reported"""
+        from googleapiclient.errors import HttpError
+
+        enable_batch_requests(self.mock_service)
+        messages = self.mock_service.users().messages()
+        messages.batchDelete.return_value.execute.side_effect = HttpError(
+            Mock(status=400), b"bad id"
+        )
+
+        def _delete(userId, id):
+            request = Mock()
+            if id == "bad":
+                request.execute.side_effect = HttpError(Mock(status=404), b"gone")
+            return request
+
+        messages.delete.side_effect = _delete
+        failures = []
+
+        with patch("gmail_automation.gmail_service.logger"):
+            deleted = batch_delete_messages(
+                self.mock_service,
+                self.user_id,
+                ["ok1", "bad", "ok2"],
+                lambda msg_id, error: failures.append(msg_id),
+            )
+
+        self.assertEqual(deleted, ["ok1", "ok2"])
+        self.assertEqual(failures, ["bad"])
+
+    def test_batch_delete_precondition_failure_not_reported_deleted(self):
+        """A chunk answered with failedPrecondition falls back per id"""
+        from googleapiclient.errors import HttpError
+
+        enable_batch_requests(self.mock_service)
+        messages = self.mock_service.users().messages()
+
+        def _delete(userId, id):
+            request = Mock()
+            if id == "stuck":
+                request.execute.side_effect = HttpError(Mock(status=400), b"nope")
+            return request
+
+        messages.delete.side_effect = _delete
+        failures = []
+
+        with (
+            patch(
+                "gmail_automation.gmail_service.execute_request_with_backoff",
+                return_value=None,
+            ),
+            patch("gmail_automation.gmail_service.logger"),
+        ):
+            deleted = batch_delete_messages(
+                self.mock_service,
+                self.user_id,
+                ["ok", "stuck"],
+                lambda msg_id, error: failures.append(msg_id),
+            )
+
+        self.assertEqual(deleted, ["ok"])
+        self.assertEqual(failures, ["stuck"])
+
+    def test_batch_modify_messages_falls_back_per_id(self):
+        """A failed batchModify retries each id with the same label change"""
+        from googleapiclient.errors import HttpError
+
+        enable_batch_requests(self.mock_service)
+        messages = self.mock_service.users().messages()
+        messages.batchModify.return_value.execute.side_effect = HttpError(
+            Mock(status=400), b"bad id"
+        )
+        messages.modify.side_effect = lambda userId, id, body: Mock()
+
+        with patch("gmail_automation.gmail_service.logger"):
+            modified = batch_modify_messages(
+                self.mock_service, self.user_id, ["m1", "m2"], ["LBL"], ["INBOX"]
+            )
+
+        self.assertEqual(modified, ["m1", "m2"])
+        messages.modify.assert_any_call(
+            userId=self.user_id,
+            id="m2",
+            body={"addLabelIds": ["LBL"], "removeLabelIds": ["INBOX"]},
+        )
+
+    def test_batch_modify_precondition_failure_not_reported_modified(self):
+        """A chunk answered with failedPrecondition is not counted as modified"""
+        from googleapiclient.errors import HttpError
+
+        enable_batch_requests(self.mock_service)
+        messages = self.mock_service.users().messages()
+        messages.modify.side_effect = lambda userId, id, body: Mock(
+            execute=Mock(side_effect=HttpError(Mock(status=400), b"nope"))
+        )
+
+        with (
+            patch(
+                "gmail_automation.gmail_service.execute_request_with_backoff",
+                return_value=None,
+            ),
+            patch("gmail_automation.gmail_service.logger"),
+        ):
+            modified = batch_modify_messages(
+                self.mock_service, self.user_id, ["m1"], ["LBL"], []
+            )
+
+        self.assertEqual(modified, [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -50,3 +50,25 @@ def test_engine_matching_and_flags():
 
     unmatched = list(engine.iter_matches("bar@other.com", "Hello"))
     assert unmatched == []
+
+
+def test_iter_matches_prefilter_agrees_with_rules():
+    config_rules = normalize_ignored_rules(
+        [
+            {"name": "Sender", "senders": ["Boss@Example.com"]},
+            {"name": "Domain", "domains": ["@news.example.org"]},
+            {"name": "Subject", "subject_contains": ["a.b (x)"]},
+        ]
+    )
+    engine = IgnoredRulesEngine.from_config(config_rules)
+    cases = [
+        ("boss@example.com", None),
+        ("Editor <editor@NEWS.example.org>", "hi"),
+        ("someone@else.com", "Re: A.B (X) report"),
+        ("someone@else.com", "a-b x"),
+        (None, None),
+    ]
+
+    for sender, subject in cases:
+        expected = [r for r in engine.rules if r.matches(sender, subject)]
+        assert list(engine.iter_matches(sender, subject)) == expected
@@ -6,12 +6,24 @@ import unittest
 import tempfile
 import json
 import os
+from pathlib import Path
 from unittest.mock import patch, Mock
 from gmail_automation.cli import main, process_emails_for_labeling
 from gmail_automation.config import load_configuration
 from gmail_automation.ignored_rules import IgnoredRulesEngine, normalize_ignored_rules
 
 
+def _redirect_data_dir(test_case, data_dir):
+    """Keep state files written by ``main()`` out of the repository."""
+    for target in (
+        "gmail_automation.config.get_data_dir",
+        "gmail_automation.gmail_service.get_data_dir",
+    ):
+        patcher = patch(target, return_value=Path(data_dir))
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests for the complete system"""
 
@@ -22,6 +34,7 @@ class TestIntegration(unittest.TestCase):
         self.data_dir = os.path.join(self.temp_dir, "data")
         os.makedirs(self.config_dir)
         os.makedirs(self.data_dir)
+        _redirect_data_dir(self, self.data_dir)
 
     def tearDown(self):
         """Clean up test fixtures"""
@@ -161,6 +174,11 @@ class TestIntegration(unittest.TestCase):
 class TestEndToEndScenarios(unittest.TestCase):
     """End-to-end test scenarios"""
 
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        _redirect_data_dir(self, temp_dir.name)
+
     @patch("gmail_automation.cli.setup_logging")
     @patch("gmail_automation.cli.get_credentials")
     @patch("gmail_automation.cli.build_service")
@@ -231,7 +249,7 @@ class TestEndToEndScenarios(unittest.TestCase):
                     # Acceptable exit
                     pass
 
-    @patch("gmail_automation.cli.save_processed_email_ids")
+    @patch("gmail_automation.cli.append_processed_email_ids")
     @patch("gmail_automation.cli.load_processed_email_ids", return_value=set())
     @patch("gmail_automation.cli.modify_message")
     @patch("gmail_automation.cli.batch_fetch_messages")
@@ -244,7 +262,7 @@ class TestEndToEndScenarios(unittest.TestCase):
         mock_batch,
         mock_modify,
         _mock_load,
-        _mock_save,
+        mock_append,
     ):
         mock_details.return_value = (
             "Alert",
@@ -303,6 +321,192 @@ class TestEndToEndScenarios(unittest.TestCase):
         self.assertEqual(args[3], ["LBL_IGNORED"])
         self.assertEqual(args[4], ["INBOX"])
         self.assertTrue(args[5])
+        mock_append.assert_called_once()
+        self.assertEqual(mock_append.call_args[0][1], {"msg1"})
+
+    @patch("gmail_automation.cli.append_processed_email_ids")
+    @patch("gmail_automation.cli.load_processed_email_ids", return_value=set())
+    @patch("gmail_automation.cli.batch_modify_messages")
+    @patch("gmail_automation.cli.batch_fetch_messages")
+    @patch("gmail_automation.cli.fetch_message_lists")
+    @patch("gmail_automation.cli.get_message_details_cached")
+    def test_sender_queries_processed_on_worker_services(
+        self,
+        mock_details,
+        mock_lists,
+        mock_batch,
+        mock_modify,
+        _mock_load,
+        mock_append,
+    ):
+        senders = ["one@example.com", "two@example.com", "three@example.com"]
+        mock_lists.side_effect = lambda _factory, _user, queries: {
+            query: [{"id": s} for s in senders if f"from:{s}" in query]
+            for query in queries
+        }
+        mock_batch.side_effect = lambda _service, _user, ids: {
+            msg_id: {"id": msg_id, "labelIds": ["INBOX"]} for msg_id in ids
+        }
+        mock_modify.side_effect = lambda _service, _user, ids, _add, _remove: ids
+        mock_details.side_effect = lambda _service, _user, msg_id, _message: (
+            "Hello",
+            "01/01/2000, 12:00 AM PST",
+            msg_id,
+            False,
+        )
+        worker_services = []
+
+        def factory():
+            worker_services.append(Mock())
+            return worker_services[-1]
+
+        config = {
+            "SENDER_TO_LABELS": {
+                "News": [
+                    {
+                        "emails": senders,
+                        "read_status": False,
+                        "delete_after_days": None,
+                    }
+                ]
+            }
+        }
+        # Distinct last run times keep the senders in separate queries.
+        last_run_times = {"one@example.com": 1, "two@example.com": 2}
+
+        processed = process_emails_for_labeling(
+            Mock(),
+            "me",
+            {"News": "LBL_NEWS"},
+            config,
+            last_run_times,
+            current_time=42,
+            ignored_rules=IgnoredRulesEngine.from_config([]),
+            service_factory=factory,
+        )
+
+        self.assertTrue(processed)
+        self.assertEqual(last_run_times, {sender: 42 for sender in senders})
+        self.assertEqual(
+            {msg_id for call in mock_modify.call_args_list for msg_id in call.args[2]},
+            set(senders),
+        )
+        self.assertTrue(
+            all(call.args[0] in worker_services for call in mock_modify.call_args_list)
+        )
+        self.assertEqual(mock_append.call_args[0][1], set(senders))
+
+    @patch("gmail_automation.cli.append_processed_email_ids")
+    @patch("gmail_automation.cli.load_processed_email_ids", return_value=set())
+    @patch("gmail_automation.cli.batch_modify_messages")
+    @patch("gmail_automation.cli.batch_fetch_messages")
+    @patch("gmail_automation.cli.fetch_message_lists")
+    @patch("gmail_automation.cli.get_message_details_cached")
+    def test_combined_query_advances_only_labeled_senders(
+        self,
+        mock_details,
+        mock_lists,
+        mock_batch,
+        mock_modify,
+        _mock_load,
+        _mock_append,
+    ):
+        """A sender whose message failed to label keeps its last run time"""
+        senders = {"a": "One <one@example.com>", "b": "two@example.com"}
+        mock_lists.side_effect = lambda _factory, _user, queries: {
+            query: [{"id": msg_id} for msg_id in senders] for query in queries
+        }
+        mock_batch.side_effect = lambda _service, _user, ids: {
+            msg_id: {"id": msg_id, "labelIds": ["INBOX"]} for msg_id in ids
+        }
+        mock_modify.return_value = ["a"]
+        mock_details.side_effect = lambda _service, _user, msg_id, _message: (
+            "Hello",
+            "01/01/2000, 12:00 AM PST",
+            senders[msg_id],
+            False,
+        )
+        config = {
+            "SENDER_TO_LABELS": {
+                "News": [
+                    {
+                        "emails": ["one@example.com", "two@example.com"],
+                        "read_status": False,
+                    }
+                ]
+            }
+        }
+        last_run_times = {"one@example.com": 1, "two@example.com": 1}
+
+        processed = process_emails_for_labeling(
+            Mock(),
+            "me",
+            {"News": "LBL_NEWS"},
+            config,
+            last_run_times,
+            current_time=42,
+            ignored_rules=IgnoredRulesEngine.from_config([]),
+            service_factory=Mock,
+        )
+
+        self.assertTrue(processed)
+        mock_lists.assert_called_once()
+        self.assertEqual(last_run_times, {"one@example.com": 42, "two@example.com": 1})
+
+    @patch("gmail_automation.cli.append_processed_email_ids")
+    @patch("gmail_automation.cli.load_processed_email_ids", return_value=set())
+    @patch("gmail_automation.cli.batch_modify_messages")
+    @patch("gmail_automation.cli.batch_fetch_messages")
+    @patch("gmail_automation.cli.fetch_message_lists")
+    @patch("gmail_automation.cli.get_message_details_cached")
+    def test_message_matched_by_two_queries_labeled_once(
+        self,
+        mock_details,
+        mock_lists,
+        mock_batch,
+        mock_modify,
+        _mock_load,
+        _mock_append,
+    ):
+        """A message returned by overlapping queries gets a single label"""
+        mock_lists.side_effect = lambda _factory, _user, queries: {
+            query: [{"id": "shared"}] for query in queries
+        }
+        mock_batch.side_effect = lambda _service, _user, ids: {
+            msg_id: {"id": msg_id, "labelIds": ["INBOX"]} for msg_id in ids
+        }
+        mock_modify.side_effect = lambda _service, _user, ids, _add, _remove: ids
+        mock_details.return_value = (
+            "Hello",
+            "01/01/2000, 12:00 AM PST",
+            "a@example.com",
+            False,
+        )
+        config = {
+            "SENDER_TO_LABELS": {
+                label: [{"emails": [sender], "read_status": False}]
+                for label, sender in (
+                    ("News", "example.com"),
+                    ("Friends", "a@example.com"),
+                )
+            }
+        }
+
+        process_emails_for_labeling(
+            Mock(),
+            "me",
+            {"News": "LBL_NEWS", "Friends": "LBL_FRIENDS"},
+            config,
+            {},
+            current_time=42,
+            ignored_rules=IgnoredRulesEngine.from_config([]),
+            service_factory=Mock,
+        )
+
+        mock_batch.assert_called_once()
+        mock_modify.assert_called_once()
+        self.assertEqual(mock_modify.call_args.args[2], ["shared"])
+        self.assertEqual(mock_modify.call_args.args[3], ["LBL_NEWS"])
 
 
 if __name__ == "__main__":
@@ -19,3 +19,22 @@ def test_setup_logging_writes_file(tmp_path):
         root.handlers.clear()
         root.handlers.extend(old_handlers)
         root.setLevel(logging.WARNING)
+
+
+def test_setup_logging_replaces_handlers_and_skips_debug(tmp_path):
+    root = logging.getLogger()
+    old_handlers = root.handlers[:]
+    root.handlers.clear()
+    try:
+        setup_logging(level="DEBUG", log_file=tmp_path / "first.log")
+        first_file = root.handlers[-1]
+        setup_logging(level="INFO")
+        assert len(root.handlers) == 1
+        assert first_file.stream is None
+        assert not get_logger(__name__).isEnabledFor(logging.DEBUG)
+    finally:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        root.handlers.extend(old_handlers)
+        root.setLevel(logging.WARNING)
@@ -1,6 +1,7 @@
 import json
 from datetime import datetime, timezone
 from pathlib import Path
+from unittest.mock import patch
 
 from gmail_automation.config import (
     DEFAULT_LAST_RUN_ISO,
@@ -75,3 +76,60 @@ def test_update_sender_times_writes_default_iso() -> None:
     assert written["new@example.com"] == DEFAULT_LAST_RUN_ISO
 
     _cleanup(sender_file)
+
+
+def test_sender_times_reuse_parse_until_file_changes() -> None:
+    """Unchanged state files are parsed once; rewrites are picked up."""
+    data_dir = _data_dir()
+    data_dir.mkdir(exist_ok=True)
+    sender_file = data_dir / "sender_last_run.json"
+    _cleanup(sender_file)
+
+    update_sender_last_run_times({"a@example.com": 100.0})
+    first = get_sender_last_run_times({"a@example.com"})
+    with patch("gmail_automation.config._json_loads") as loads:
+        second = get_sender_last_run_times({"a@example.com"})
+    loads.assert_not_called()
+    assert first == second == {"a@example.com": 100.0}
+
+    update_sender_last_run_times({"a@example.com": 200.0})
+    assert get_sender_last_run_times({"a@example.com"}) == {"a@example.com": 200.0}
+
+    _cleanup(sender_file)
+
+
+def test_update_sender_times_writes_utc_iso_seconds() -> None:
+    """Timestamps are stored as second-resolution UTC ISO strings."""
+    data_dir = _data_dir()
+    data_dir.mkdir(exist_ok=True)
+    sender_file = data_dir / "sender_last_run.json"
+    _cleanup(sender_file)
+
+    ts = datetime(2024, 3, 10, 9, 30, 5, tzinfo=timezone.utc).timestamp()
+    update_sender_last_run_times({"a@example.com": ts + 0.75})
+
+    written = json.loads(sender_file.read_text())
+    assert written["a@example.com"] == "2024-03-10T09:30:05Z"
+    assert get_sender_last_run_times({"a@example.com"}) == {"a@example.com": ts}
+
+    _cleanup(sender_file)
+
+
+def test_invalid_sender_time_skipped() -> None:
+    """A malformed entry falls back to the default for that sender only."""
+    data_dir = _data_dir()
+    data_dir.mkdir(exist_ok=True)
+    sender_file = data_dir / "sender_last_run.json"
+    _cleanup(sender_file)
+    sender_file.write_text(
+        json.dumps({"removed@example.com": "not a date", "ok@example.com": 5})
+    )
+
+    times = get_sender_last_run_times({"ok@example.com", "removed@example.com"})
+
+    assert times == {
+        "ok@example.com": 5.0,
+        "removed@example.com": DEFAULT_LAST_RUN_TIME,
+    }
+
+    _cleanup(sender_file)
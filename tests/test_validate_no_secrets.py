@@ -0,0 +1,37 @@
+import fnmatch
+
+import pytest
+
+from scripts import validate_no_secrets
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "client_secret_1.json",
+        "config/client_secret_1.json",
+        "data/gmail-token.json",
+        "logs/run.log",
+        "last_run.txt",
+        "data/message_details_cache.json",
+        "README.md",
+    ],
+)
+def test_matches_agrees_with_fnmatch(path):
+    expected = any(fnmatch.fnmatch(path, pat) for pat in validate_no_secrets.PATTERNS)
+    assert validate_no_secrets.matches(path) is expected
+
+
+def test_list_changed_files_splits_staged_and_untracked(monkeypatch):
+    class Result:
+        returncode = 0
+        stdout = "A  added.json\0R  new.txt\0old.txt\0 M edited.py\0?? logs/a.log\0"
+
+    monkeypatch.setattr(validate_no_secrets.subprocess, "run", lambda *a, **k: Result())
+    staged, untracked = validate_no_secrets.list_changed_files()
+    assert staged == ["added.json", "new.txt"]
+    assert untracked == ["logs/a.log"]
+
+
+def test_message_details_cache_flagged():
+    assert validate_no_secrets.matches("data/message_details_cache.json")